@@ -0,0 +1,42 @@
+# Compare one rds-data client per statement (the previous behaviour of
+# aurora.my_execute_statement) with the pooled client of aurora.get_client.
+# Offline the Data API answers locally, so only the client side cost is measured.
+# Pass --live to run `select 1` against the cluster configured in the environment.
+import argparse
+
+import common
+
+import boto3
+
+import aurora
+
+EMPTY_RESPONSE = {'records': [], 'columnMetadata': [], 'numberOfRecordsUpdated': 0}
+
+
+def per_call_client(live):
+    client = boto3.client('rds-data')
+    if not live:
+        common.answer_offline(client, EMPTY_RESPONSE)
+    return client.execute_statement(resourceArn=aurora.DBAuroraClusterArn,
+        secretArn=aurora.DBSecretsStoreArn, database=aurora.DBName, sql="select 1")
+
+
+def pooled_client(live):
+    client = aurora.get_client()
+    if not live:
+        common.answer_offline(client, EMPTY_RESPONSE)
+    return client.execute_statement(resourceArn=aurora.DBAuroraClusterArn,
+        secretArn=aurora.DBSecretsStoreArn, database=aurora.DBName, sql="select 1")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", default=50, type=int, help="statements per variant")
+    parser.add_argument("--live", action="store_true", help="talk to the real Data API")
+    args = parser.parse_args()
+
+    # first statement of a container, including client creation
+    aurora.reset_clients()
+    common.report("pooled client, first statement", common.measure(lambda: pooled_client(args.live), 1))
+    common.report("pooled client, warm statement", common.measure(lambda: pooled_client(args.live), args.repeat))
+    common.report("client per statement", common.measure(lambda: per_call_client(args.live), args.repeat))
@@ -0,0 +1,45 @@
+# Compare aurora.to_python_dict with the decoding it replaced, which allocated
+# two lists per cell and re-zipped the column names for every row.
+import argparse
+
+import common
+
+import aurora
+
+
+def legacy_to_python_dict(rds_response, which_columns=None):
+    column_metadata = rds_response["columnMetadata"]
+    records = rds_response["records"]
+    column_names = [metadata['name'] for metadata in column_metadata]
+    column_selector = [True]*len(column_names)
+    if which_columns is not None:
+        column_selector = [column_name in which_columns for column_name in column_names]
+    return [legacy_format_record(record, column_names, column_selector) for record in records]
+
+
+def legacy_format_record(record, column_names, column_selector):
+    formatted_record = {}
+    for column_name, column, select in zip(column_names, record, column_selector):
+        if select:
+            formatted_record[column_name]= list(column.values())[0]
+            if list(column.keys())[0] == "isNull":
+                formatted_record[column_name] = None
+    return formatted_record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=100000, type=int, help="records per response")
+    parser.add_argument("--columns", default=5, type=int, help="columns per record")
+    parser.add_argument("--null_ratio", default=0.1, type=float, help="share of null cells")
+    parser.add_argument("--repeat", default=5, type=int, help="decodes per variant")
+    args = parser.parse_args()
+
+    response = common.synthetic_response(args.rows, args.columns, args.null_ratio)
+    assert legacy_to_python_dict(response) == aurora.to_python_dict(response)
+
+    legacy = common.measure(lambda: legacy_to_python_dict(response), args.repeat)
+    compiled = common.measure(lambda: aurora.to_python_dict(response), args.repeat)
+    common.report(f"legacy decode, {args.rows} rows", legacy)
+    common.report(f"compiled decode, {args.rows} rows", compiled)
+    print(f"speedup {legacy / compiled:.1f}x")
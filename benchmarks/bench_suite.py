@@ -0,0 +1,112 @@
+# Throughput and peak memory of the aurora decode and binding hot paths on
+# synthetic Data API responses of several shapes. Results are written as JSON
+# (one file per commit) so that runs can be compared:
+#
+#     python benchmarks/bench_suite.py --rows 1000 100000
+#     python benchmarks/bench_suite.py --compare out/bench_suite_<other hash>.json
+import os
+import json
+import time
+import pathlib
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+import common
+
+import aurora
+
+# name -> (columns, share of null cells)
+SHAPES = {
+    'narrow': (3, 0.0),
+    'wide': (30, 0.0),
+    'null_heavy': (10, 0.5),
+}
+
+
+def decode_cases(response):
+    column_names = [metadata['name'] for metadata in response["columnMetadata"]]
+    column_selector = [True]*len(column_names)
+    return {
+        'to_python_dict': lambda: aurora.to_python_dict(response),
+        'to_python_dict_typed': lambda: aurora.to_python_dict(response, typed=True),
+        'to_python_dict_tuple': lambda: aurora.to_python_dict(response, row_factory="tuple"),
+        'to_python_dict_slots': lambda: aurora.to_python_dict(response, row_factory="slots"),
+        'to_columns': lambda: aurora.to_columns(response),
+        'format_record': lambda: [aurora.format_record(record, column_names, column_selector)
+                                  for record in response["records"]],
+    }
+
+
+def binding_cases(response):
+    all_rows = aurora.to_python_dict(response)
+    # create_parameter only knows string, long and bool, both cases bind those values
+    param_types = {int: "long", str: "string", bool: "bool"}
+    rows = [{name: value for name, value in row.items() if type(value) in param_types} for row in all_rows]
+    return {
+        'create_parameter': lambda: [[aurora.create_parameter(name, value, param_types[type(value)])
+                                      for name, value in row.items()]
+                                     for row in rows],
+        'bind_parameters': lambda: [aurora.bind_parameters(row) for row in rows],
+        'bind_parameters_all_types': lambda: [aurora.bind_parameters(row) for row in all_rows],
+    }
+
+
+def run_case(function, rows, repeat):
+    # time without tracing, tracemalloc slows allocations down a lot
+    best = min(common.measure(function, 1) for _ in range(repeat))
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': best, 'rows_per_second': rows / best, 'peak_bytes': peak}
+
+
+def run(row_counts, shapes, repeat):
+    results = {}
+    for shape in shapes:
+        columns, null_ratio = SHAPES[shape]
+        for rows in row_counts:
+            response = common.synthetic_response(rows, columns, null_ratio)
+            cases = decode_cases(response)
+            cases.update(binding_cases(response))
+            for case, function in cases.items():
+                name = f"{case}/{shape}/{rows}"
+                results[name] = run_case(function, rows, repeat)
+                print(f"{name:<45} {results[name]['rows_per_second']:14,.0f} rows/s "
+                      f"{results[name]['peak_bytes'] / 2**20:10.1f} MiB peak")
+            del response, cases
+    return results
+
+
+def compare(results, other_file):
+    with open(other_file) as fp:
+        other = json.load(fp)
+    print(f"\nspeed relative to {other['commit']} (>1 is faster now)")
+    for name, result in results.items():
+        if name in other['results']:
+            ratio = result['rows_per_second'] / other['results'][name]['rows_per_second']
+            print(f"{name:<45} {ratio:8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000, 100000],
+        help="records per response, e.g. 1000 1000000")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument("--repeat", default=3, type=int, help="timed runs per case, the best counts")
+    parser.add_argument("--outpath", default="out", type=str, help="whereto results are written")
+    parser.add_argument("--compare", type=str, help="results file of another run")
+    args = parser.parse_args()
+
+    commit = subprocess.check_output(["git", "describe", "--always", "--dirty"]).strip().decode("utf-8")
+    results = run(args.rows, args.shapes, args.repeat)
+    pathlib.Path(args.outpath).mkdir(parents=True, exist_ok=True)
+    file_name = os.path.join(args.outpath, f"bench_suite_{commit}.json")
+    with open(file_name, 'w') as fp:
+        json.dump({'commit': commit, 'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   'python': platform.python_version(), 'results': results}, fp, indent=2)
+    print(f"results written to {file_name}")
+    if args.compare:
+        compare(results, args.compare)
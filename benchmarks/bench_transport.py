@@ -0,0 +1,96 @@
+# Compare the boto3 rds-data client with the slim SigV4 client of aurora.sigv4.
+# Cold is a new interpreter importing aurora, building the client and sending the
+# first statement, as in the INIT of a Lambda container. Warm is a statement on the
+# pooled client. Offline both talk to a local http server answering with a fixed
+# response, so serialisation, signing, http and parsing are measured. Pass --live
+# to run `select 1` against the cluster configured in the environment instead.
+import os
+import sys
+import json
+import argparse
+import threading
+import subprocess
+import http.server
+
+import common
+
+import aurora
+import aurora.sigv4
+
+RESPONSE = common.synthetic_response(10)
+for record in RESPONSE["records"]:
+    # the Data API sends blobs base64 encoded
+    record[4] = {'blobValue': "cGlj"}
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import aurora
+if {sigv4!r}:
+    import aurora.sigv4
+    client = aurora.sigv4.SigV4Client(endpoint_url={endpoint_url!r})
+else:
+    import boto3
+    client = boto3.session.Session().client('rds-data', endpoint_url={endpoint_url!r},
+                                            config=aurora.default_client_config())
+client.execute_statement(resourceArn=aurora.DBAuroraClusterArn, secretArn=aurora.DBSecretsStoreArn,
+                         database=aurora.DBName, sql="select 1")
+print(time.perf_counter() - start)
+"""
+
+
+class DataApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps(RESPONSE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DataApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def cold_start(endpoint_url, sigv4):
+    code = COLD_START.format(sigv4=sigv4, endpoint_url=endpoint_url)
+    output = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=str(common.LAYER_DIRECTORY)),
+                            check=True, capture_output=True, text=True).stdout
+    return float(output)
+
+
+def statement(client):
+    return client.execute_statement(resourceArn=aurora.DBAuroraClusterArn,
+        secretArn=aurora.DBSecretsStoreArn, database=aurora.DBName, sql="select 1")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", default=200, type=int, help="warm statements per client")
+    parser.add_argument("--cold-repeat", default=5, type=int, help="cold starts per client")
+    parser.add_argument("--live", action="store_true", help="talk to the real Data API")
+    args = parser.parse_args()
+
+    endpoint_url = None if args.live else serve()
+    import boto3
+    boto3_client = boto3.session.Session().client('rds-data', endpoint_url=endpoint_url,
+                                                  config=aurora.default_client_config())
+    sigv4_client = aurora.sigv4.SigV4Client(endpoint_url=endpoint_url)
+    assert aurora.to_python_dict(statement(boto3_client)) == aurora.to_python_dict(statement(sigv4_client))
+
+    if not args.live:
+        for name, sigv4 in (("boto3", False), ("sigv4", True)):
+            cold = sum(cold_start(endpoint_url, sigv4) for _ in range(args.cold_repeat)) / args.cold_repeat
+            common.report(f"{name}, cold start", cold)
+    common.report("boto3, warm statement", common.measure(lambda: statement(boto3_client), args.repeat))
+    common.report("sigv4, warm statement", common.measure(lambda: statement(sigv4_client), args.repeat))
@@ -0,0 +1,88 @@
+# Shared setup for the benchmarks in this folder.
+# Run the benchmarks from project root directory, e.g. `python benchmarks/bench_client.py`
+import os
+import sys
+import json
+import time
+import pathlib
+
+LAYER_DIRECTORY = pathlib.Path(__file__).parent.parent.joinpath(
+    "src", "functions", "layer_database_src", "python")
+sys.path.insert(0, str(LAYER_DIRECTORY))
+
+# aurora reads these at import time. Offline runs get placeholders, set the real values
+# (as exported by the main stack) to benchmark against a cluster.
+os.environ.setdefault("DBSecretsStoreArn", "arn:aws:secretsmanager:eu-central-1:123456789012:secret:bench")
+os.environ.setdefault("DBAuroraClusterArn", "arn:aws:rds:eu-central-1:123456789012:cluster:bench")
+os.environ.setdefault("DBName", "bench")
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+
+def measure(function, repeat):
+    """
+    Call function repeat times and return the mean wall time per call in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(name, seconds_per_call):
+    print(f"{name:<40} {seconds_per_call * 1000:10.3f} ms/call")
+
+
+def answer_offline(client, response_body):
+    """
+    Let client answer every request with response_body instead of sending it.
+    Serialisation, signing and parsing still run, only the network is skipped.
+    """
+    from botocore.awsrequest import AWSResponse
+
+    class _Raw(object):
+        def __init__(self, body):
+            self._body = body
+
+        def stream(self, **kwargs):
+            yield self._body
+
+    body = json.dumps(response_body).encode("utf-8")
+
+    def send(request, **kwargs):
+        return AWSResponse(request.url, 200, {'content-type': 'application/json'}, _Raw(body))
+
+    client.meta.events.register('before-send.rds-data', send, unique_id='benchmark-offline')
+    return client
+
+
+# Data API column types and a cell factory for synthetic responses
+SYNTHETIC_COLUMN_TYPES = [
+    ("BIGINT", lambda row: {'longValue': row}),
+    ("VARCHAR", lambda row: {'stringValue': f"show {row}"}),
+    ("DOUBLE", lambda row: {'doubleValue': row / 7}),
+    ("BIT", lambda row: {'booleanValue': row % 2 == 0}),
+    ("VARBINARY", lambda row: {'blobValue': b"pic"}),
+]
+
+
+def synthetic_response(rows, columns=5, null_ratio=0.0):
+    """
+    Build an ExecuteStatement response with rows records and columns columns,
+    cycling through SYNTHETIC_COLUMN_TYPES. null_ratio of the cells are null.
+    """
+    column_types = [SYNTHETIC_COLUMN_TYPES[index % len(SYNTHETIC_COLUMN_TYPES)] for index in range(columns)]
+    column_metadata = [{'name': f"c{index}_{type_name.lower()}", 'typeName': type_name}
+                       for index, (type_name, _) in enumerate(column_types)]
+    null_every = int(1 / null_ratio) if null_ratio else 0
+    records = []
+    for row in range(rows):
+        record = []
+        for index, (_, make_cell) in enumerate(column_types):
+            if null_every and (row + index) % null_every == 0:
+                record.append({'isNull': True})
+            else:
+                record.append(make_cell(row))
+        records.append(record)
+    return {'records': records, 'columnMetadata': column_metadata, 'numberOfRecordsUpdated': 0}
@@ -3,10 +3,18 @@ import json
 
 import aurora
 
+# start resuming an auto-paused cluster while the rest of the init runs
+aurora.warm()
+
+# statements are compiled and checked once during Lambda init
+aurora.register_statement("getShow",
+    "select sName, sID, description, pic, picCounter from shows where sID=:sID", {'sID': int})
+
+@aurora.metrics.flushing
 def handler(event, context):
     print(f"function executed with context: {context}")
     #print(f"function executed with event: {event}")
-    response = aurora.simple_call_rds_data_api("select sName, sID, description, pic, picCounter from shows where sID=1", parameters=None)
+    response = aurora.execute_named("getShow", {'sID': 1})
     response = aurora.to_python_dict(response)
     if event["resolve"]== "query.getShow":
         response = response[0]
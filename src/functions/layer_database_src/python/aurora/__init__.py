@@ -0,0 +1,1629 @@
+
+# Adapted from: https://github.com/aws-samples/amazon-rds-data-api-demo/blob/master/src/main/python/lambda_function_postgres.py
+# Required imports
+import os
+import re
+import logging
+import json
+import datetime
+import decimal
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# boto3 is imported when the first boto3 client is built, see _create_client
+from botocore.exceptions import ClientError
+
+from aurora import metrics
+from aurora import query_stats
+from aurora import slow_log
+from aurora.result_cache import ResultCache, written_tables
+
+DBSecretsStoreArn= os.environ["DBSecretsStoreArn"]
+DBAuroraClusterArn= os.environ["DBAuroraClusterArn"]
+DBName= os.environ["DBName"]
+
+# connection settings of the rds-data client shared by all invocations of a container
+DBMaxPoolConnections = int(os.environ.get("DBMaxPoolConnections", "10"))
+DBConnectTimeout = float(os.environ.get("DBConnectTimeout", "5"))
+DBReadTimeout = float(os.environ.get("DBReadTimeout", "60"))
+DBTcpKeepAlive = os.environ.get("DBTcpKeepAlive", "true").lower() == "true"
+
+# Data API request limits, batch_execute splits parameter sets into chunks below them.
+# A request may be 4 MiB, leave room for the sql statement and the arns.
+BATCH_MAX_PARAMETER_SETS = 1000
+BATCH_MAX_PAYLOAD_BYTES = 3 * 1024 * 1024
+# limits of one multi-row insert of bulk_insert: the Data API accepts 64 KiB of sql,
+# MySQL 65535 placeholders per statement
+BULK_MAX_SQL_CHARS = 65536
+BULK_MAX_PARAMETERS = 65535
+
+# column metadata of read statements, keyed by normalise_sql, so that repeated
+# statements are sent without includeResultMetadata. When it is full the oldest
+# entry is dropped. Statements generated by aurora pass changing values (e.g. the
+# offset of iter_rows) as parameters, so that they keep one entry.
+DBSchemaCache = os.environ.get("DBSchemaCache", "true").lower() == "true"
+_SCHEMA_CACHE_SIZE = 256
+_schemas = {}
+
+# read-through cache of read statement responses, off unless DBResultCacheSize > 0
+# or enable_result_cache is called. ttls per statement are kept in _cache_ttls.
+DBResultCacheSize = int(os.environ.get("DBResultCacheSize", "0"))
+DBResultCacheTTL = float(os.environ.get("DBResultCacheTTL", "60"))
+_cache_ttls = {}
+_result_cache = None
+if DBResultCacheSize > 0:
+    _result_cache = ResultCache(DBResultCacheSize, DBResultCacheTTL, _cache_ttls)
+
+# Aurora Serverless pauses after SecondsUntilAutoPause, the first statements afterwards
+# fail while it resumes. They are retried after each of these delays (in seconds), by
+# default for about a minute, a resume usually takes 30 to 60 seconds.
+DBResumeBackoff = [float(delay) for delay in
+                   os.environ.get("DBResumeBackoff", "0.5,1,2,4,8,15,15,15").split(",") if delay]
+_RESUMING_ERROR_CODES = ("DatabaseResumingException",)
+_RESUMING_ERROR_MESSAGES = ("communications link failure", "resuming after being auto-paused")
+# calls, total and max latency of statements which did or did not wait for a resume
+_resume_latency = {'resumed': [0, 0.0, 0.0], 'direct': [0, 0.0, 0.0]}
+_resume_latency_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+# read statements whose response exceeds the Data API limit are re-read in LIMIT/OFFSET
+# slices, up to DBSplitConcurrency of them at a time
+DBSplitConcurrency = int(os.environ.get("DBSplitConcurrency", "4"))
+_RESPONSE_SIZE_ERROR = "response size limit"
+
+# rds-data clients of this container, keyed by region, config and keep-alive setting.
+# They are built by _client_factory, see set_client_factory. With DBTransport=sigv4
+# the slim client of aurora.sigv4 is used instead of boto3.
+DBTransport = os.environ.get("DBTransport", "boto3").lower()
+_clients = {}
+_clients_lock = threading.Lock()
+
+def default_client_config(max_pool_connections=None, connect_timeout=None, read_timeout=None):
+    """
+    Build the botocore config used for the rds-data client.
+    Values which are not given are taken from the DB* environment variables.
+    """
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=max_pool_connections or DBMaxPoolConnections,
+        connect_timeout=connect_timeout or DBConnectTimeout,
+        read_timeout=read_timeout or DBReadTimeout)
+
+def get_client(region_name=None, config=None, tcp_keepalive=None):
+    """
+    Return the rds-data client of this container for region and config.
+    The client (service model, credentials and urllib3 connection pool) is built on
+    first use and reused by every later statement and warm invocation.
+    Without config the client factory uses the DB* environment variables.
+    """
+    if tcp_keepalive is None:
+        tcp_keepalive = DBTcpKeepAlive
+    key = (region_name, None if config is None else _config_key(config), tcp_keepalive)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _client_factory(region_name, config, tcp_keepalive)
+                _clients[key] = client
+    return client
+
+def reset_clients():
+    """
+    Forget all cached clients, the next statement builds a new one.
+    """
+    with _clients_lock:
+        _clients.clear()
+
+def set_client_factory(factory=None):
+    """
+    Build clients with factory(region_name, config, tcp_keepalive) from now on,
+    e.g. the SQLite stand-in of aurora.local. None restores the boto3 client.
+    """
+    global _client_factory
+    with _clients_lock:
+        _client_factory = factory if factory is not None else _create_client
+        _clients.clear()
+
+def _config_key(config):
+    # botocore configs are not hashable, the options passed by the user identify them
+    return repr(sorted(config._user_provided_options.items()))
+
+def _create_client(region_name, config, tcp_keepalive):
+    import boto3
+    if config is None:
+        config = default_client_config()
+    client = boto3.session.Session().client('rds-data', region_name=region_name, config=config)
+    if tcp_keepalive:
+        _enable_tcp_keepalive(client._endpoint.http_session)
+    metrics.instrument_client(client)
+    return client
+
+def _enable_tcp_keepalive(http_session):
+    # botocore only reads tcp_keepalive from the shared config file, so add SO_KEEPALIVE
+    # to the socket options of the client's http session. Its verify, proxy and client
+    # certificate settings stay as botocore configured them. No connection exists yet,
+    # the pools and proxy managers created from now on use the new options.
+    keepalive = (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    socket_options = list(http_session._socket_options)
+    if keepalive not in socket_options:
+        socket_options.append(keepalive)
+    http_session._socket_options = socket_options
+    http_session._manager.connection_pool_kw['socket_options'] = socket_options
+
+_client_factory = _create_client
+if DBTransport == "sigv4":
+    from aurora import sigv4
+    _client_factory = sigv4.client_factory
+
+def my_execute_statement(sql_statement, param_set, transaction_id=None):
+    ttl_key = None
+    if isinstance(param_set, dict):
+        expanded_sql, param_set = expand_in_lists(sql_statement, param_set)
+        param_set = bind_parameters(param_set)
+        if expanded_sql is not sql_statement:
+            # the cache ttl of the statement as written applies to all its expansions
+            ttl_key, sql_statement = normalise_sql(sql_statement), expanded_sql
+    return _execute_request(_statement_request(sql_statement), param_set, transaction_id,
+                            _schema_key(sql_statement), ttl_key)
+
+def _statement_request(sql_statement):
+    # the part of an ExecuteStatement request which is the same for every call
+    return {
+        'resourceArn': DBAuroraClusterArn,
+        'secretArn': DBSecretsStoreArn,
+        'database': DBName,
+        'sql': sql_statement}
+
+def _schema_key(sql_statement):
+    # key of the statement in the schema cache, None if its metadata is not cached
+    schema_key = normalise_sql(sql_statement)
+    if not is_read_statement(schema_key) or ";" in schema_key:
+        return None
+    return schema_key
+
+def _execute_request(request, param_set, transaction_id, schema_key, ttl_key=None):
+    # ttl_key is the key of the result cache ttl if it is not the schema key,
+    # e.g. the statement before its IN lists were expanded
+    if not _measuring():
+        return _execute_split_on_size_limit(request, param_set, transaction_id, schema_key, ttl_key)
+    return _measured(request['sql'], param_set, transaction_id, _execute_split_on_size_limit,
+                     request, param_set, transaction_id, schema_key, ttl_key)
+
+def _measuring():
+    return metrics.DBMetrics or query_stats.DBQueryStats or slow_log.DBSlowQueryThreshold is not None
+
+def _measured(sql_statement, param_set, transaction_id, function, *args):
+    # run the statement and record it in aurora.metrics, aurora.query_stats and
+    # aurora.slow_log. param_set is None for batches.
+    metrics.start_statement()
+    start = time.perf_counter()
+    try:
+        response = function(*args)
+    except Exception:
+        elapsed = time.perf_counter() - start
+        if query_stats.DBQueryStats:
+            query_stats.record(sql_fingerprint(sql_statement), elapsed, None)
+        if slow_log.DBSlowQueryThreshold is not None and elapsed >= slow_log.DBSlowQueryThreshold:
+            slow_log.record(sql_statement, sql_fingerprint(sql_statement), param_set, elapsed, None,
+                            transaction_id)
+        raise
+    elapsed = time.perf_counter() - start
+    fingerprint = sql_fingerprint(sql_statement)
+    if metrics.DBMetrics:
+        metrics.record_statement(fingerprint, elapsed, response)
+    if query_stats.DBQueryStats:
+        query_stats.record(fingerprint, elapsed, response)
+    if slow_log.DBSlowQueryThreshold is not None and elapsed >= slow_log.DBSlowQueryThreshold:
+        slow_log.record(sql_statement, fingerprint, param_set, elapsed, response, transaction_id)
+    return response
+
+def _execute_split_on_size_limit(request, param_set, transaction_id, schema_key, ttl_key=None):
+    try:
+        return _execute_cached(request, param_set, transaction_id, schema_key, ttl_key)
+    except ClientError as error:
+        if schema_key is None or not is_response_size_error(error):
+            raise
+        size_error = error
+    logger.warning("response exceeds the Data API size limit, reading it in slices: %s",
+                   sql_fingerprint(request['sql']))
+    return _execute_in_slices(request, param_set, transaction_id, size_error)
+
+def is_response_size_error(error):
+    """
+    True if error is the Data API refusing a response above its size limit.
+    """
+    return isinstance(error, ClientError) and \
+        _RESPONSE_SIZE_ERROR in (error.response.get('Error', {}).get('Message') or "").lower()
+
+def _execute_in_slices(request, param_set, transaction_id, size_error):
+    # read one response from LIMIT/OFFSET slices of the statement, see _slicer.
+    # Statements which cannot be sliced safely raise size_error.
+    sql_statement = request['sql'].strip().rstrip(';').rstrip()
+    metadata_request = dict(request, sql=f"select * from ({sql_statement}) as aurora_slice limit 0")
+    count_request = dict(request, sql=f"select count(*) from ({sql_statement}) as aurora_count")
+    try:
+        column_metadata = _send_request(metadata_request, param_set, transaction_id, True)["columnMetadata"]
+        slice_sql = _slicer(sql_statement, len(column_metadata), param_set)
+        if slice_sql is None:
+            logger.warning("statement cannot be read in slices, it has a limit without order by "
+                           "or in a subquery: %s", sql_fingerprint(sql_statement))
+            raise size_error
+        total = _send_request(count_request, param_set, transaction_id, False)["records"][0][0]["longValue"]
+    except ClientError as error:
+        if error is size_error:
+            raise
+        # e.g. MySQL refuses a derived table with duplicate column names (select s.sID, p.sID),
+        # the caller gets the error of its own statement
+        logger.warning("statement cannot be read in slices: %s: %s", sql_fingerprint(sql_statement), error)
+        raise size_error
+
+    # parameters of the limit are written into the slices
+    slice_parameters = _used_parameters(slice_sql(0, 1), param_set)
+
+    def read_slice(offset, limit):
+        slice_request = dict(request, sql=slice_sql(offset, limit))
+        try:
+            return _send_request(slice_request, slice_parameters, transaction_id, False)["records"]
+        except ClientError as error:
+            if limit <= 1 or not is_response_size_error(error):
+                raise
+        # still too large, read the slice as two halves
+        half = limit // 2
+        return read_slice(offset, half) + read_slice(offset + half, limit - half)
+
+    slices = max(2, DBSplitConcurrency)
+    slice_rows = max(1, -(-total // slices))
+    offsets = list(range(0, total, slice_rows))
+    if transaction_id is not None or DBSplitConcurrency <= 1:
+        # statements of a transaction run one after another
+        parts = [read_slice(offset, slice_rows) for offset in offsets]
+    else:
+        with ThreadPoolExecutor(max_workers=min(DBSplitConcurrency, DBMaxPoolConnections)) as executor:
+            parts = list(executor.map(lambda offset: read_slice(offset, slice_rows), offsets))
+    records = []
+    for part in parts:
+        records.extend(part)
+    return {'records': records, 'columnMetadata': column_metadata, 'numberOfRecordsUpdated': 0}
+
+# quoted strings and identifiers, blanked out before looking for top-level clauses
+_QUOTED = re.compile(r"'(?:[^'\\]|''|\\.)*'|\"(?:[^\"\\]|\"\"|\\.)*\"|`[^`]*`")
+_ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+_LIMIT = re.compile(r"\blimit\b", re.IGNORECASE)
+# limit and offset are numbers or :name parameters
+_LIMIT_CLAUSE = re.compile(r"limit\s+(\d+|:\w+)(?:\s*,\s*(\d+|:\w+)|\s+offset\s+(\d+|:\w+))?\s*$",
+                           re.IGNORECASE)
+
+def _slicer(sql_statement, column_count, param_set=None):
+    # Return a function slice_sql(offset, limit) giving the sql of rows offset to
+    # offset + limit of the statement, or None if the statement cannot be sliced,
+    # see _in_total_order
+    ordered = _in_total_order(sql_statement, column_count, param_set)
+    if ordered is None:
+        return None
+    sql_statement, start, count = ordered
+
+    def slice_sql(offset, limit):
+        if count is not None:
+            limit = min(limit, count - offset)
+        return f"{sql_statement} limit {limit} offset {start + offset}"
+    return slice_sql
+
+def _in_total_order(sql_statement, column_count, param_set=None):
+    # Return the statement without its top-level limit in a total order, with the
+    # offset and row count of that limit, or None if it cannot be read in parts.
+    # Parts have to be read in a total order to neither overlap nor miss rows, so
+    # all columns are appended to the top-level order by as tie-breakers, or are the
+    # order by. A limit without order by picks arbitrary rows and is not split.
+    split = _top_level_limit(sql_statement, param_set)
+    if split is None:
+        return None
+    sql_statement, start, count = split
+    ordinals = ", ".join(str(index + 1) for index in range(column_count))
+    if _ORDER_BY.search(_top_level_sql(_mask_quoted(sql_statement))):
+        return f"{sql_statement}, {ordinals}", start, count
+    if count is not None:
+        return None
+    return f"{sql_statement} order by {ordinals}", start, count
+
+def _top_level_limit(sql_statement, param_set=None):
+    # Split the statement into its sql before the top-level limit and the offset and
+    # row count of that limit (count None without one). None if a limit cannot be
+    # applied to parts of the statement: limits of subqueries, whose rows could
+    # differ from part to part, and limits which are neither numbers nor longValue
+    # parameters of param_set.
+    masked = _mask_quoted(sql_statement)
+    top_level = _top_level_sql(masked)
+    limits = list(_LIMIT.finditer(top_level))
+    if len(_LIMIT.findall(masked)) > len(limits):
+        return None
+    if not limits:
+        return sql_statement, 0, None
+    limit_start = limits[-1].start()
+    match = _LIMIT_CLAUSE.match(sql_statement, limit_start)
+    if match is None:
+        return None
+    if match.group(2) is not None:
+        start, count = match.group(1), match.group(2)
+    else:
+        start, count = match.group(3) or "0", match.group(1)
+    start, count = _limit_value(start, param_set), _limit_value(count, param_set)
+    if start is None or count is None:
+        return None
+    return sql_statement[:limit_start].rstrip(), start, count
+
+def _limit_value(value, param_set):
+    if not value.startswith(":"):
+        return int(value)
+    for parameter in param_set or ():
+        if parameter['name'] == value[1:]:
+            return parameter['value'].get('longValue')
+    return None
+
+def _mask_quoted(sql_statement):
+    return _QUOTED.sub(lambda match: " " * len(match.group(0)), sql_statement)
+
+def _top_level_sql(masked):
+    # the statement (with quoted parts already blanked) with everything in
+    # parentheses replaced by spaces, so that positions stay the same
+    chars = []
+    depth = 0
+    for char in masked:
+        if char == "(":
+            depth += 1
+        chars.append(char if depth == 0 else " ")
+        if char == ")" and depth > 0:
+            depth -= 1
+    return "".join(chars)
+
+def _execute_cached(request, param_set, transaction_id, schema_key, ttl_key=None):
+    cache = _result_cache
+    if cache is None:
+        return _execute_uncached(request, param_set, transaction_id, schema_key)
+    if schema_key is None:
+        response = _execute_uncached(request, param_set, transaction_id, schema_key)
+        _invalidate_result_cache(request['sql'])
+        return response
+    if transaction_id is not None:
+        # reads inside a transaction may see its uncommitted writes
+        return _execute_uncached(request, param_set, transaction_id, schema_key)
+    cache_key = (schema_key, repr(param_set))
+    response = cache.get(cache_key)
+    if response is None:
+        # a write during the read may have come too late for it, see ResultCache.generation
+        generation = cache.generation(schema_key)
+        response = _execute_uncached(request, param_set, transaction_id, schema_key)
+        cache.put(cache_key, schema_key, response, generation, ttl_key)
+    return _copy_response(response)
+
+def _copy_response(response):
+    # callers may modify the response and its lists, the cached one stays as it is.
+    # The rows (and their cells) are shared, they are treated as read-only.
+    response = dict(response)
+    for key in ("records", "columnMetadata"):
+        if key in response:
+            response[key] = list(response[key])
+    return response
+
+def _execute_uncached(request, param_set, transaction_id, schema_key):
+    if not DBSchemaCache:
+        schema_key = None
+    column_metadata = _schemas.get(schema_key) if schema_key is not None else None
+    if column_metadata is not None:
+        response = _send_request(request, param_set, transaction_id, False)
+        records = response.get("records")
+        if not records or len(records[0]) == len(column_metadata):
+            # a copy, callers may modify the list of their response
+            response["columnMetadata"] = list(column_metadata)
+            return response
+        # the schema changed (e.g. select * after an alter table), fetch it again
+        _schemas.pop(schema_key, None)
+    response = _send_request(request, param_set, transaction_id, True)
+    if schema_key is not None and response.get("columnMetadata"):
+        if len(_schemas) >= _SCHEMA_CACHE_SIZE and schema_key not in _schemas:
+            _schemas.pop(next(iter(_schemas), None), None)
+        _schemas[schema_key] = response["columnMetadata"]
+    return response
+
+def _send_request(request, param_set, transaction_id, include_result_metadata, resume=True):
+    # without resume the statement is sent once, also outside of a transaction
+    request = dict(request, parameters=param_set, includeResultMetadata=include_result_metadata,
+                   **_transaction_kwargs(transaction_id))
+    if transaction_id is not None or not resume:
+        # an open transaction means the cluster is running, there is nothing to wait for
+        return get_client().execute_statement(**request)
+    return call_resuming(get_client().execute_statement, **request)
+
+def is_resuming_error(error):
+    """
+    True if error is a Data API error raised while the cluster resumes from auto-pause.
+    """
+    if not isinstance(error, ClientError):
+        return False
+    details = error.response.get('Error', {})
+    if details.get('Code') in _RESUMING_ERROR_CODES:
+        return True
+    message = (details.get('Message') or "").lower()
+    return any(resuming_message in message for resuming_message in _RESUMING_ERROR_MESSAGES)
+
+def call_resuming(function, **kwargs):
+    """
+    Call a Data API function and retry it on the DBResumeBackoff schedule as long
+    as the cluster is resuming from auto-pause. The latency is recorded separately
+    for calls which had to wait for a resume, see resume_stats.
+    """
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        try:
+            response = function(**kwargs)
+            break
+        except ClientError as error:
+            if retries >= len(DBResumeBackoff) or not is_resuming_error(error):
+                raise
+            time.sleep(DBResumeBackoff[retries])
+            retries += 1
+    elapsed = time.perf_counter() - start
+    if retries:
+        logger.warning("database resumed from auto-pause after %d retries and %.1f s", retries, elapsed)
+    with _resume_latency_lock:
+        latency = _resume_latency['resumed' if retries else 'direct']
+        latency[0] += 1
+        latency[1] += elapsed
+        latency[2] = max(latency[2], elapsed)
+    return response
+
+def resume_stats():
+    """
+    Return calls, total, mean and max latency (in seconds) of statements which
+    waited for an auto-pause resume ('resumed') and of all others ('direct').
+    """
+    return {kind: {'calls': calls, 'total_time': total_time,
+                   'mean_time': total_time / calls if calls else 0.0, 'max_time': max_time}
+            for kind, (calls, total_time, max_time) in _resume_latency.items()}
+
+def warm(background=True):
+    """
+    Send a `select 1` so that a paused cluster starts resuming. Call it during
+    Lambda init; with background the ping runs on a daemon thread and the init
+    does not wait for the resume. Returns the thread, or the response otherwise.
+    """
+    def ping():
+        try:
+            return call_resuming(get_client().execute_statement, **_statement_request("select 1"))
+        except Exception:
+            # the statement which needs the database reports the error, the ping only warms
+            logger.exception("warming the database failed")
+    if not background:
+        return ping()
+    thread = threading.Thread(target=ping, name="aurora-warm", daemon=True)
+    thread.start()
+    return thread
+
+_WHITESPACE = re.compile(r"\s+")
+_READ_STATEMENTS = ("select", "with", "show", "explain", "describe", "desc")
+
+def normalise_sql(sql_statement):
+    """
+    Collapse whitespace and drop trailing semicolons, so that the same statement
+    written differently maps to the same key.
+    """
+    return _WHITESPACE.sub(" ", sql_statement).strip().rstrip(";").rstrip()
+
+# string literals, and numbers which are not part of a name or placeholder
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?<![\w:.])-?\d+(?:\.\d+)?(?:e[-+]?\d+)?\b",
+                          re.IGNORECASE)
+_fingerprints = {}
+_FINGERPRINT_CACHE_SIZE = 1024
+
+def sql_fingerprint(sql_statement):
+    """
+    Normalise the statement and replace its literals by '?', so that statements
+    which only differ in their values share one fingerprint.
+    """
+    fingerprint = _fingerprints.get(sql_statement)
+    if fingerprint is None:
+        fingerprint = _SQL_LITERAL.sub("?", normalise_sql(sql_statement))
+        if len(_fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+            _fingerprints.clear()
+        _fingerprints[sql_statement] = fingerprint
+    return fingerprint
+
+def is_read_statement(sql_statement):
+    """
+    True if the statement only reads, judged by its first keyword.
+    """
+    return sql_statement.lstrip(" (").split(" ", 1)[0].lower() in _READ_STATEMENTS
+
+def clear_schema_cache():
+    _schemas.clear()
+
+def enable_result_cache(max_entries=1024, default_ttl=60):
+    """
+    Cache the responses of read statements outside of transactions, keyed by
+    statement and parameters. Entries live for the ttl of their statement (see
+    set_cache_ttl), the least recently used is evicted beyond max_entries and
+    writes through aurora drop the entries of the tables they touch (all entries
+    if their tables are not known, e.g. for a call).
+    Writes by other containers or AppSync resolvers are only seen after the ttl.
+    """
+    global _result_cache
+    _result_cache = ResultCache(max_entries, default_ttl, _cache_ttls)
+    return _result_cache
+
+def disable_result_cache():
+    global _result_cache
+    _result_cache = None
+
+def set_cache_ttl(sql_statement, ttl):
+    """
+    Set the ttl in seconds of one statement in the result cache, 0 never caches it.
+    """
+    _cache_ttls[normalise_sql(sql_statement)] = ttl
+
+def result_cache_stats():
+    """
+    Return size, hits, misses, evictions, expirations and invalidations of the
+    result cache, or None if it is disabled.
+    """
+    if _result_cache is None:
+        return None
+    return _result_cache.stats()
+
+def my_batch_execute_statement(sql_statement, param_sets, transaction_id=None):
+    rds_data = get_client()
+    request = dict(
+        resourceArn = DBAuroraClusterArn,
+        secretArn = DBSecretsStoreArn,
+        database = DBName,
+        sql = sql_statement,
+        parameterSets = param_sets,
+        **_transaction_kwargs(transaction_id))
+    if _measuring():
+        response = _measured(sql_statement, None, transaction_id,
+                             lambda: call_resuming(rds_data.batch_execute_statement, **request))
+    else:
+        response = call_resuming(rds_data.batch_execute_statement, **request)
+    _invalidate_result_cache(sql_statement)
+    return response
+
+def _invalidate_result_cache(sql_statement):
+    cache = _result_cache
+    if cache is not None:
+        _invalidate(cache, written_tables(sql_statement))
+
+def _invalidate(cache, tables):
+    # tables None: the written tables are not known
+    if tables is None:
+        cache.invalidate_all()
+    elif tables:
+        cache.invalidate_tables(tables)
+
+def _transaction_kwargs(transaction_id):
+    # botocore rejects None, so transactionId is only sent inside a transaction
+    if transaction_id is None:
+        return {}
+    return {'transactionId': transaction_id}
+
+class Transaction:
+    """
+    Statements executed through a Transaction run in its Data API transaction.
+    Every response is kept in results, in execution order.
+    """
+    def __init__(self, transaction_id):
+        self.transaction_id = transaction_id
+        self.results = []
+        # invalidated in the result cache again on commit, None for tables which are not known
+        self.written_tables = set()
+
+    def execute(self, sql_statement, parameters=None):
+        if parameters is None:
+            parameters = []
+        response = my_execute_statement(sql_statement, parameters, self.transaction_id)
+        self._add_written_tables(sql_statement)
+        self.results.append(response)
+        return response
+
+    def execute_named(self, name, values=None):
+        response = execute_named(name, values, self.transaction_id)
+        self._add_written_tables(_statements[name].sql)
+        self.results.append(response)
+        return response
+
+    def batch_execute(self, sql_statement, param_sets):
+        # chunks are sent one after another, a transaction runs its statements in order
+        update_results = [_execute_chunk(sql_statement, chunk, self.transaction_id)
+                          for chunk in chunk_parameter_sets(param_sets)]
+        self._add_written_tables(sql_statement)
+        self.results.append(update_results)
+        return update_results
+
+    def _add_written_tables(self, sql_statement):
+        tables = written_tables(sql_statement)
+        if tables is None:
+            self.written_tables = None
+        elif self.written_tables is not None:
+            self.written_tables.update(tables)
+
+@contextmanager
+def transaction():
+    """
+    Run the statements of the with block atomically:
+
+        with aurora.transaction() as tx:
+            tx.execute("insert into shows(sName) VALUES (:sName)", parameters)
+            tx.execute("select * from shows WHERE sID=LAST_INSERT_ID()")
+
+    The transaction is committed when the block ends and rolled back when it raises.
+    """
+    rds_data = get_client()
+    transaction_id = call_resuming(rds_data.begin_transaction,
+        resourceArn = DBAuroraClusterArn,
+        secretArn = DBSecretsStoreArn,
+        database = DBName)['transactionId']
+    tx = Transaction(transaction_id)
+    try:
+        yield tx
+    except BaseException:
+        rds_data.rollback_transaction(
+            resourceArn = DBAuroraClusterArn,
+            secretArn = DBSecretsStoreArn,
+            transactionId = transaction_id)
+        raise
+    rds_data.commit_transaction(
+        resourceArn = DBAuroraClusterArn,
+        secretArn = DBSecretsStoreArn,
+        transactionId = transaction_id)
+    if _result_cache is not None:
+        # reads outside of the transaction may have cached the old rows in the meantime
+        _invalidate(_result_cache, tx.written_tables)
+
+def batch_execute(sql_statement, param_sets, max_workers=1,
+        max_parameter_sets=BATCH_MAX_PARAMETER_SETS, max_payload_bytes=BATCH_MAX_PAYLOAD_BYTES):
+    """
+    Execute one sql statement for many parameter sets with BatchExecuteStatement.
+    A parameter set is a list of Data API parameters or a dict for bind_parameters.
+    The parameter sets are split into chunks which fit the Data API limits. With
+    max_workers > 1 the chunks are sent concurrently over the pooled client.
+    The updateResults of every chunk are returned in chunk order.
+    """
+    chunks = list(chunk_parameter_sets(param_sets, max_parameter_sets, max_payload_bytes))
+    max_workers = min(max_workers, len(chunks), DBMaxPoolConnections)
+    if max_workers <= 1:
+        return [_execute_chunk(sql_statement, chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda chunk: _execute_chunk(sql_statement, chunk), chunks))
+
+def chunk_parameter_sets(param_sets, max_parameter_sets=BATCH_MAX_PARAMETER_SETS,
+        max_payload_bytes=BATCH_MAX_PAYLOAD_BYTES):
+    """
+    Yield lists of parameter sets with at most max_parameter_sets entries and an
+    estimated request payload of at most max_payload_bytes.
+    """
+    chunk = []
+    chunk_bytes = 0
+    for param_set in param_sets:
+        if isinstance(param_set, dict):
+            param_set = bind_parameters(param_set)
+        param_set_bytes = _payload_size(param_set)
+        if chunk and (len(chunk) >= max_parameter_sets or
+                chunk_bytes + param_set_bytes > max_payload_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(param_set)
+        chunk_bytes += param_set_bytes
+    if chunk:
+        yield chunk
+
+def _execute_chunk(sql_statement, chunk, transaction_id=None):
+    return my_batch_execute_statement(sql_statement, chunk, transaction_id)['updateResults']
+
+def _payload_size(param_set):
+    # size of the parameter set in the json request, blobs are sent base64 encoded
+    return len(json.dumps(param_set, default=lambda blob: "=" * (4 * len(blob) // 3 + 4)))
+
+def bulk_insert(table, rows, columns=None, max_workers=1, in_transaction=False,
+        max_sql_chars=BULK_MAX_SQL_CHARS, max_parameters=BULK_MAX_PARAMETERS,
+        max_payload_bytes=BATCH_MAX_PAYLOAD_BYTES):
+    """
+    Insert rows (dicts, or sequences in the order of columns) into table with
+    multi-row `INSERT ... VALUES (...),(...)` statements, each as large as the sql
+    length, placeholder and payload limits allow. With in_transaction the
+    statements run one after another in one transaction, otherwise up to
+    max_workers of them run concurrently and each commits on its own.
+    Returns rows, statements, seconds and rows_per_second.
+    """
+    start = time.perf_counter()
+    rows = list(rows)
+    if columns is None:
+        columns = list(rows[0]) if rows else []
+    statements = list(_pack_insert_statements(table, columns, rows, max_sql_chars,
+                                              max_parameters, max_payload_bytes))
+    if in_transaction:
+        with transaction() as tx:
+            for sql_statement, parameters in statements:
+                tx.execute(sql_statement, parameters)
+    else:
+        max_workers = min(max_workers, len(statements), DBMaxPoolConnections)
+        if max_workers <= 1:
+            for sql_statement, parameters in statements:
+                my_execute_statement(sql_statement, parameters)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(lambda statement: my_execute_statement(*statement), statements))
+    seconds = time.perf_counter() - start
+    return {'rows': len(rows), 'statements': len(statements), 'seconds': seconds,
+            'rows_per_second': len(rows) / seconds if seconds else 0.0}
+
+def _quote_identifier(name):
+    if "`" in name:
+        raise ValueError(f"identifier {name} must not contain backticks")
+    return f"`{name}`"
+
+def _pack_insert_statements(table, columns, rows, max_sql_chars, max_parameters, max_payload_bytes):
+    # yield (sql, parameters) of multi-row inserts, the sql of a row count is built once
+    prefix = f"insert into {_quote_identifier(table)}({', '.join(map(_quote_identifier, columns))}) values "
+    sql_by_row_count = {}
+    row_sql = []
+    parameters = []
+    payload_bytes = 0
+    sql_chars = len(prefix)
+    for row in rows:
+        values = [row[column] for column in columns] if isinstance(row, dict) else row
+        index = len(row_sql)
+        names = [f"v{index}_{position}" for position in range(len(columns))]
+        row_parameters = [_bind_value(name, value) for name, value in zip(names, values)]
+        tuple_sql = "(" + ", ".join(":" + name for name in names) + ")"
+        row_bytes = _payload_size(row_parameters)
+        if row_sql and (sql_chars + len(tuple_sql) + 1 > max_sql_chars or
+                len(parameters) + len(columns) > max_parameters or
+                payload_bytes + row_bytes > max_payload_bytes):
+            yield _insert_sql(prefix, row_sql, sql_by_row_count), parameters
+            # start the next statement with this row as its first one
+            names = [f"v0_{position}" for position in range(len(columns))]
+            row_parameters = [_bind_value(name, value) for name, value in zip(names, values)]
+            tuple_sql = "(" + ", ".join(":" + name for name in names) + ")"
+            row_sql = []
+            parameters = []
+            payload_bytes = 0
+            sql_chars = len(prefix)
+        row_sql.append(tuple_sql)
+        parameters.extend(row_parameters)
+        payload_bytes += row_bytes
+        sql_chars += len(tuple_sql) + 1
+    if row_sql:
+        yield _insert_sql(prefix, row_sql, sql_by_row_count), parameters
+
+def _insert_sql(prefix, row_sql, sql_by_row_count):
+    sql_statement = sql_by_row_count.get(len(row_sql))
+    if sql_statement is None:
+        sql_statement = prefix + ",".join(row_sql)
+        sql_by_row_count[len(row_sql)] = sql_statement
+    return sql_statement
+
+def create_parameter(name, value, param_type):
+    typestring = "stringValue"
+    if param_type=="int" or param_type=="long":
+        typestring = "longValue"
+    elif param_type=="bool":
+        typestring = "booleanValue"
+    elif param_type!="string":
+        raise ValueError(f"param_type {param_type} not supported." +
+            "currently has to be one of int, long, bool or string")
+    return {'name': name, 'value': {typestring: value}}
+
+def _format_datetime(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    if value.microsecond:
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def _format_time(value):
+    if value.microsecond:
+        return value.strftime("%H:%M:%S.%f")[:-3]
+    return value.strftime("%H:%M:%S")
+
+# Data API value field, conversion of the value (None sends it as it is) and typeHint
+# (or None) per python type, see bind_parameters. None is sent as isNull.
+_ENCODERS = {
+    type(None): ('isNull', None, None),
+    bool: ('booleanValue', None, None),
+    int: ('longValue', None, None),
+    float: ('doubleValue', None, None),
+    str: ('stringValue', None, None),
+    bytes: ('blobValue', None, None),
+    bytearray: ('blobValue', bytes, None),
+    memoryview: ('blobValue', memoryview.tobytes, None),
+    decimal.Decimal: ('stringValue', str, "DECIMAL"),
+    datetime.datetime: ('stringValue', _format_datetime, "TIMESTAMP"),
+    datetime.date: ('stringValue', datetime.date.isoformat, "DATE"),
+    datetime.time: ('stringValue', _format_time, "TIME"),
+    dict: ('stringValue', json.dumps, "JSON"),
+    list: ('stringValue', json.dumps, "JSON"),
+}
+
+# compiled binders per key set of the dicts passed to bind_parameters for the value
+# types seen last, and all compiled binders by key set and value types
+_binders = {}
+_typed_binders = {}
+_BINDER_CACHE_SIZE = 256
+
+def bind_parameters(values):
+    """
+    Turn a dict of parameter name to python value into Data API parameters.
+    The value field and typeHint are inferred from the python type: None, bool,
+    int, float, str, bytes, Decimal, datetime, date, time and JSON dicts/lists.
+    Names may be given with or without the leading colon used in the sql.
+    """
+    keys = tuple(values)
+    bind = _binders.get(keys)
+    if bind is not None:
+        parameters = bind(values)
+        if parameters is not None:
+            return parameters
+    # a new key set, or values of other types than last time (e.g. None)
+    value_types = tuple(map(type, values.values()))
+    bind = _typed_binders.get((keys, value_types))
+    if bind is None:
+        bind = _compile_binder(keys, value_types)
+        if len(_typed_binders) >= _BINDER_CACHE_SIZE:
+            _typed_binders.clear()
+            _binders.clear()
+        _typed_binders[(keys, value_types)] = bind
+    _binders[keys] = bind
+    return bind(values)
+
+def _compile_binder(keys, value_types):
+    # generates e.g.
+    #   def bind(values):
+    #       v0, v1, = values.values()
+    #       if v0.__class__ is not _tv0 or v1.__class__ is not _tv1:
+    #           return None
+    #       return [{'name': 'sID', 'value': {'longValue': v0}},
+    #               {'name': 'day', 'value': {'stringValue': _cv1(v1)}, 'typeHint': 'DATE'}]
+    # names, fields and typeHints are literals, only the values are filled in.
+    # Values of other types return None, bind_parameters picks another binder for them
+    cells = [f"v{index}" for index in range(len(keys))]
+    namespace = {}
+    parameters = []
+    for cell, key, value_type in zip(cells, keys, value_types):
+        namespace[f"_t{cell}"] = value_type
+        field, convert, type_hint = _encoder(value_type)
+        if field == "isNull":
+            value = "True"
+        elif convert is None:
+            value = cell
+        else:
+            namespace[f"_c{cell}"] = convert
+            value = f"_c{cell}({cell})"
+        parameter = f"{{'name': {key.lstrip(':')!r}, 'value': {{{field!r}: {value}}}"
+        if type_hint is not None:
+            parameter += f", 'typeHint': {type_hint!r}"
+        parameters.append(parameter + "}")
+    body = ""
+    if cells:
+        body += f"    {', '.join(cells)}, = values.values()\n"
+        body += "    if " + " or ".join(f"{cell}.__class__ is not _t{cell}" for cell in cells) + ":\n"
+        body += "        return None\n"
+    body += "    return [" + ", ".join(parameters) + "]\n"
+    exec(f"def bind(values):\n{body}", namespace)
+    return namespace['bind']
+
+def _bind_value(name, value):
+    field, convert, type_hint = _encoder(value.__class__)
+    if field == "isNull":
+        value = True
+    elif convert is not None:
+        value = convert(value)
+    if type_hint is None:
+        return {'name': name, 'value': {field: value}}
+    return {'name': name, 'value': {field: value}, 'typeHint': type_hint}
+
+def _encoder(value_type):
+    encoder = _ENCODERS.get(value_type)
+    if encoder is None:
+        encoder = _encoder_for_subclass(value_type)
+    return encoder
+
+def _encoder_for_subclass(value_type):
+    # e.g. enum.IntEnum or a str subclass, remembered for the next value of that type
+    for base_type in (bool, int, float, str, bytes, decimal.Decimal, datetime.datetime,
+                      datetime.date, datetime.time, dict, list):
+        if issubclass(value_type, base_type):
+            _ENCODERS[value_type] = _ENCODERS[base_type]
+            return _ENCODERS[base_type]
+    raise ValueError(f"parameter type {value_type.__name__} not supported")
+
+# named statements of this container, see register_statement
+_statements = {}
+# :name placeholders outside of string literals, '::' casts are no placeholders
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+# string literals (kept as they are) or [NOT] IN (:name)
+_IN_LIST = re.compile(r"('(?:[^']|'')*')|\b((?:NOT\s+)?IN\s*\(\s*):([A-Za-z_]\w*)(\s*\))", re.IGNORECASE)
+# an empty subquery: IN it is false and NOT IN it is true for every value, null included
+_EMPTY_IN_LIST = "SELECT NULL FROM DUAL WHERE 1 = 0"
+
+# expanded sql per statement and IN list sizes, see expand_in_lists
+_in_list_shapes = {}
+_IN_LIST_SHAPE_CACHE_SIZE = 256
+
+def expand_in_lists(sql_statement, values):
+    """
+    Expand list or tuple values of placeholders written as IN (:name) or
+    NOT IN (:name) into one placeholder per element, IN (:name_0, :name_1, ...),
+    and return the sql and the values for bind_parameters. Lists are padded to
+    the next power of two by repeating their last element, so a statement takes
+    one shape per size bucket and the schema cache keeps its hits. An empty list
+    becomes an empty subquery, so IN matches no row and NOT IN every row.
+    Lists of other placeholders stay JSON parameters.
+    """
+    sizes = {key.lstrip(":"): len(value) for key, value in values.items()
+             if isinstance(value, (list, tuple))}
+    if not sizes:
+        return sql_statement, values
+    buckets = tuple(sorted((name, 1 << (size - 1).bit_length() if size else 0)
+                           for name, size in sizes.items()))
+    shape = _in_list_shapes.get((sql_statement, buckets))
+    if shape is None:
+        shape = _expand_in_list_sql(sql_statement, dict(buckets))
+        if len(_in_list_shapes) >= _IN_LIST_SHAPE_CACHE_SIZE:
+            _in_list_shapes.clear()
+        _in_list_shapes[(sql_statement, buckets)] = shape
+    expanded_sql, expanded, remaining = shape
+    if not expanded:
+        return sql_statement, values
+    expanded_values = {}
+    for key, value in values.items():
+        name = key.lstrip(":")
+        if name not in expanded or name in remaining:
+            expanded_values[key] = value
+        if name in expanded and value:
+            padding = [value[-1]] * (expanded[name] - len(value))
+            for index, element in enumerate(list(value) + padding):
+                expanded_values[f"{name}_{index}"] = element
+    return expanded_sql, expanded_values
+
+def _expand_in_list_sql(sql_statement, buckets):
+    # returns the expanded sql, the bucket of every expanded name and the names
+    # which are still used as placeholders elsewhere in the sql
+    expanded = {}
+
+    def expand(match):
+        name = match.group(3)
+        if match.group(1) is not None or name not in buckets:
+            return match.group(0)
+        expanded[name] = buckets[name]
+        items = ", ".join(f":{name}_{index}" for index in range(buckets[name])) or _EMPTY_IN_LIST
+        return f"{match.group(2)}{items}{match.group(4)}"
+
+    expanded_sql = _IN_LIST.sub(expand, sql_statement)
+    remaining = set(_PLACEHOLDER.findall(_STRING_LITERAL.sub("''", expanded_sql)))
+    return expanded_sql, expanded, remaining
+
+class Statement:
+    """
+    A named sql statement with its parameter schema, compiled into the request
+    which is sent for it. calls, errors, total_time and max_time count its
+    executions in this container.
+    """
+    def __init__(self, name, sql_statement, parameters):
+        self.name = name
+        self.sql = sql_statement
+        self.parameters = parameters
+        self.request = _statement_request(sql_statement)
+        self.schema_key = _schema_key(sql_statement)
+        # request and schema key per shape of the expanded IN lists
+        self._shapes = {}
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._lock = threading.Lock()
+
+    def execute(self, values=None, transaction_id=None):
+        if values is None:
+            values = {}
+        self.validate(values)
+        start = time.perf_counter()
+        try:
+            sql_statement, values = expand_in_lists(self.sql, values)
+            if sql_statement is self.sql:
+                request, schema_key, ttl_key = self.request, self.schema_key, None
+            else:
+                shape = self._shapes.get(sql_statement)
+                if shape is None:
+                    shape = self._shapes[sql_statement] = (_statement_request(sql_statement),
+                                                           _schema_key(sql_statement))
+                # the cache ttl of the registered statement applies to all its expansions
+                (request, schema_key), ttl_key = shape, self.schema_key
+            return _execute_request(request, bind_parameters(values), transaction_id, schema_key, ttl_key)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+    def validate(self, values):
+        if len(values) != len(self.parameters) or any(name not in values for name in self.parameters):
+            raise ValueError(f"statement {self.name} expects parameters {sorted(self.parameters)}, "
+                             f"got {sorted(values)}")
+        for name, value_type in self.parameters.items():
+            if value_type is not None and not isinstance(values[name], value_type):
+                raise ValueError(f"parameter {name} of statement {self.name} has to be of type "
+                                 f"{value_type}, got {type(values[name]).__name__}")
+
+def register_statement(name, sql_statement, parameters=None, cache_ttl=None):
+    """
+    Declare a named statement, best at module level so it runs during Lambda init.
+    parameters maps every :name placeholder of the sql to a python type (or tuple
+    of types, None accepts anything). Placeholders and parameters which do not
+    match raise ValueError right away instead of when the statement is executed.
+    cache_ttl sets the ttl of the statement in the result cache.
+    """
+    if parameters is None:
+        parameters = {}
+    placeholders = set(_PLACEHOLDER.findall(_STRING_LITERAL.sub("''", sql_statement)))
+    if placeholders != set(parameters):
+        raise ValueError(f"statement {name} uses placeholders {sorted(placeholders)} "
+                         f"but declares parameters {sorted(parameters)}")
+    if name in _statements and _statements[name].sql != sql_statement:
+        raise ValueError(f"statement {name} is already registered with different sql")
+    statement = Statement(name, sql_statement, dict(parameters))
+    _statements[name] = statement
+    if cache_ttl is not None:
+        set_cache_ttl(sql_statement, cache_ttl)
+    return statement
+
+def execute_named(name, values=None, transaction_id=None):
+    """
+    Execute the registered statement name with a dict of parameter values.
+    """
+    statement = _statements.get(name)
+    if statement is None:
+        raise ValueError(f"statement {name} is not registered")
+    return statement.execute(values, transaction_id)
+
+def statement_stats():
+    """
+    Return calls, errors, total, mean and max latency (in seconds) per registered statement.
+    """
+    return {name: {'calls': statement.calls,
+                   'errors': statement.errors,
+                   'total_time': statement.total_time,
+                   'mean_time': statement.total_time / statement.calls if statement.calls else 0.0,
+                   'max_time': statement.max_time}
+            for name, statement in _statements.items()}
+
+def simple_call_rds_data_api(sql_statements, parameters=None):
+    """
+    Get a list of or one sql statement and execute them.
+    parameters is a list of Data API parameters or a dict for bind_parameters.
+    For one statement its response is returned. A list of statements returns the
+    list of their responses in order: read-only statements run concurrently, if
+    one of them writes they all run in one transaction. Each statement gets the
+    parameters its placeholders use, list values of IN (:name) are expanded as in
+    expand_in_lists.
+    """
+    if parameters is None:
+        parameters = []
+    if not isinstance(sql_statements, list):
+        return my_execute_statement(sql_statements, parameters)
+
+    # a dict keeps the values of the statement's placeholders, IN lists expand per statement
+    parameters_by_statement = [_used_parameters(sql, parameters) for sql in sql_statements]
+    if not all(is_read_statement(normalise_sql(sql)) for sql in sql_statements):
+        with transaction() as tx:
+            for sql, statement_parameters in zip(sql_statements, parameters_by_statement):
+                tx.execute(sql, statement_parameters)
+        return tx.results
+    max_workers = min(len(sql_statements), DBMaxPoolConnections)
+    if max_workers <= 1:
+        return [my_execute_statement(sql, statement_parameters)
+                for sql, statement_parameters in zip(sql_statements, parameters_by_statement)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(my_execute_statement, sql_statements, parameters_by_statement))
+
+def _used_parameters(sql_statement, parameters):
+    # the Data API parameters, or the dict values, of the placeholders of the statement
+    placeholders = set(_PLACEHOLDER.findall(_STRING_LITERAL.sub("''", sql_statement)))
+    if isinstance(parameters, dict):
+        return {key: value for key, value in parameters.items() if key.lstrip(":") in placeholders}
+    return [parameter for parameter in parameters if parameter['name'] in placeholders]
+
+def to_python_dict(rds_response, which_columns=None, typed=False, row_factory="dict"):
+    """
+    Functionality inspired by:
+    https://docs.aws.amazon.com/appsync/latest/devguide/resolver-util-reference.html#rds-helpers-in-util-rds
+    With typed, values are converted according to their column type, see TypedRow.
+    row_factory selects a more compact row than a dict, see row_decoder.
+    """
+    start = time.perf_counter()
+    if typed:
+        decode_row = typed_row_decoder(rds_response["columnMetadata"], which_columns, row_factory)
+    else:
+        decode_row = row_decoder(rds_response["columnMetadata"], which_columns, row_factory)
+    rows = [decode_row(record) for record in rds_response["records"]]
+    if metrics.DBMetrics:
+        metrics.record_decode(rds_response, time.perf_counter() - start)
+    return rows
+
+def format_record(record, column_names, column_selector):
+    formatted_record = {}
+    for column_name, column, select in zip(column_names, record, column_selector):
+        if select:
+            formatted_record[column_name] = _decode_cell(column)
+    return formatted_record
+
+# field of a Data API value which holds the python value, by (first word of the) typeName
+_VALUE_FIELDS = {}
+_VALUE_FIELDS.update(dict.fromkeys(
+    ["TINYINT", "SMALLINT", "MEDIUMINT", "INT", "INTEGER", "BIGINT", "SERIAL"], "longValue"))
+_VALUE_FIELDS.update(dict.fromkeys(["FLOAT", "DOUBLE", "REAL"], "doubleValue"))
+_VALUE_FIELDS.update(dict.fromkeys(["BIT", "BOOL", "BOOLEAN"], "booleanValue"))
+_VALUE_FIELDS.update(dict.fromkeys(
+    ["BINARY", "VARBINARY", "TINYBLOB", "BLOB", "MEDIUMBLOB", "LONGBLOB"], "blobValue"))
+_VALUE_FIELDS.update(dict.fromkeys(
+    ["CHAR", "VARCHAR", "TINYTEXT", "TEXT", "MEDIUMTEXT", "LONGTEXT", "ENUM", "SET",
+     "DECIMAL", "NUMERIC", "DATE", "TIME", "DATETIME", "TIMESTAMP", "YEAR", "JSON"], "stringValue"))
+
+# compiled row decoders, keyed by column names, types, selected columns and row factory
+_row_decoders = {}
+_ROW_DECODER_CACHE_SIZE = 256
+
+ROW_FACTORIES = ("dict", "tuple", "namedtuple", "slots")
+
+def row_decoder(column_metadata, which_columns=None, row_factory="dict"):
+    """
+    Return a function which turns one record of a response with this
+    columnMetadata into a python dict. The function is generated once per column
+    schema and reads the value field expected for each column type directly.
+    Other row factories do not repeat the column names in every row:
+    'tuple' returns plain tuples in column order, 'namedtuple' and 'slots' return
+    a namedtuple or a __slots__ class generated per column schema, which support
+    attribute and index access and as_dict().
+    """
+    return _cached_row_decoder(column_metadata, which_columns, row_factory, None)
+
+def _cached_row_decoder(column_metadata, which_columns, row_factory, converters):
+    if row_factory not in ROW_FACTORIES:
+        raise ValueError(f"row_factory {row_factory} not supported, has to be one of {ROW_FACTORIES}")
+    columns = tuple((metadata['name'], metadata.get('typeName')) for metadata in column_metadata)
+    key = (columns, None if which_columns is None else tuple(which_columns), row_factory,
+           converters is not None)
+    decode_row = _row_decoders.get(key)
+    if decode_row is None:
+        decode_row = _compile_row_decoder(columns, which_columns, row_factory, converters)
+        if len(_row_decoders) >= _ROW_DECODER_CACHE_SIZE:
+            _row_decoders.clear()
+        _row_decoders[key] = decode_row
+    return decode_row
+
+def _compile_row_decoder(columns, which_columns, row_factory="dict", converters=None):
+    # generates e.g.
+    #   def decode_row(record):
+    #       c0, c1 = record
+    #       return {'sID': c0['longValue'] if 'longValue' in c0 else _decode_cell(c0), ...}
+    # cells which do not hold the expected field (nulls, unknown types) take the generic path.
+    # Compact rows return the values as a tuple instead, converters (typed compact rows)
+    # are applied right away since these rows have no room to remember conversions
+    cells = [f"c{index}" for index in range(len(columns))]
+    names = []
+    values = []
+    namespace = {'_decode_cell': _decode_cell, '_convert': _convert}
+    for cell, (name, type_name) in zip(cells, columns):
+        if which_columns is not None and name not in which_columns:
+            continue
+        field = _VALUE_FIELDS.get((type_name or "").split(" ")[0].upper())
+        if field is None:
+            value = f"_decode_cell({cell})"
+        else:
+            value = f"{cell}[{field!r}] if {field!r} in {cell} else _decode_cell({cell})"
+        if converters is not None and name in converters:
+            namespace[f"_k{cell}"] = converters[name]
+            value = f"_convert(_k{cell}, {value})"
+        names.append(name)
+        values.append(value)
+    body = f"    {', '.join(cells)}, = record\n" if cells else ""
+    if row_factory == "dict":
+        body += "    return {" + ", ".join(f"{name!r}: {value}" for name, value in zip(names, values)) + "}\n"
+    elif row_factory == "slots":
+        namespace['_Row'] = row_class = _row_class(tuple(names), row_factory)
+        namespace['_object_new'] = object.__new__
+        body += "    row = _object_new(_Row)\n"
+        body += "".join(f"    row.{field} = {value}\n" for field, value in zip(row_class._fields, values))
+        body += "    return row\n"
+    else:
+        result = "(" + "".join(f"{value}, " for value in values) + ")"
+        if row_factory == "namedtuple":
+            namespace['_Row'] = _row_class(tuple(names), row_factory)
+            namespace['_new'] = tuple.__new__
+            result = f"_new(_Row, {result})"
+        body += f"    return {result}\n"
+    source = f"def decode_row(record):\n{body}"
+    exec(source, namespace)
+    return namespace['decode_row']
+
+def _convert(converter, value):
+    return None if value is None else converter(value)
+
+def _row_class(column_names, row_factory):
+    # attribute names follow the namedtuple rules, invalid or duplicate column
+    # names become _<index>, as_dict() always uses the column names
+    base = namedtuple("Row", column_names, rename=True)
+    if row_factory == "namedtuple":
+        return type("Row", (base,), {'__slots__': (), '_column_names': column_names,
+                                     'as_dict': lambda self: dict(zip(column_names, self))})
+    return type("Row", (_Row,), {'__slots__': base._fields, '_fields': base._fields,
+                                 '_column_names': column_names})
+
+class _Row:
+    """
+    Base class of the __slots__ rows of row_factory 'slots'.
+    """
+    __slots__ = ()
+    _fields = ()
+    _column_names = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        return getattr(self, self._fields[index])
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __iter__(self):
+        for field in self._fields:
+            yield getattr(self, field)
+
+    def as_dict(self):
+        return dict(zip(self._column_names, self))
+
+    def __eq__(self, other):
+        if isinstance(other, _Row):
+            return tuple(self) == tuple(other)
+        return tuple(self) == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Row(" + ", ".join(f"{field}={value!r}" for field, value in zip(self._fields, self)) + ")"
+
+def _decode_cell(cell):
+    # a Data API value holds exactly one field, isNull marks a null value
+    for field, value in cell.items():
+        if field == "isNull":
+            return None
+        return value
+    return None
+
+# numpy dtypes of the Data API value fields, other fields become object arrays
+_NUMPY_DTYPES = {'longValue': 'int64', 'doubleValue': 'float64', 'booleanValue': 'bool'}
+_NUMPY_NULL_FILL = {'longValue': 0, 'doubleValue': 0.0, 'booleanValue': False}
+
+def to_columns(rds_response, which_columns=None, numpy=False):
+    """
+    Return the response column-wise as a dict of column name to list of values.
+    With numpy every column is a numpy masked array instead, typed as int64,
+    float64 or bool where the column type allows it and masked where the value
+    is null. numpy is imported only then and has to be installed.
+    """
+    start = time.perf_counter()
+    column_metadata = rds_response["columnMetadata"]
+    # transposing the records is a single pass in C, the columns are decoded afterwards
+    cells_by_column = list(zip(*rds_response["records"]))
+    if not cells_by_column:
+        cells_by_column = [()] * len(column_metadata)
+    if numpy:
+        import numpy as np
+    columns = {}
+    for metadata, cells in zip(column_metadata, cells_by_column):
+        name = metadata['name']
+        if which_columns is not None and name not in which_columns:
+            continue
+        field = _VALUE_FIELDS.get((metadata.get('typeName') or "").split(" ")[0].upper())
+        if field is None:
+            values = [_decode_cell(cell) for cell in cells]
+        else:
+            values = [cell[field] if field in cell else _decode_cell(cell) for cell in cells]
+        if numpy:
+            values = _to_masked_array(np, values, field)
+        columns[name] = values
+    if metrics.DBMetrics:
+        metrics.record_decode(rds_response, time.perf_counter() - start)
+    return columns
+
+def _to_masked_array(np, values, field):
+    mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    dtype = _NUMPY_DTYPES.get(field)
+    if dtype is None:
+        return np.ma.array(np.array(values, dtype=object), mask=mask)
+    if mask.any():
+        fill = _NUMPY_NULL_FILL[field]
+        values = [fill if value is None else value for value in values]
+    return np.ma.array(np.array(values, dtype=dtype), mask=mask)
+
+class TypedRow(dict):
+    """
+    A row dict whose DECIMAL, DATETIME/TIMESTAMP, DATE, JSON and BLOB values are
+    converted to Decimal, datetime, date, parsed JSON and memoryview when they are
+    first read, MySQL zero dates ('0000-00-00') to None. Columns which are never
+    read are never converted.
+    Indexing, get, pop, setdefault, popitem, items, values, copy, dict(row),
+    {**row}, update from a row and json.dumps all see converted values. Reading
+    through dict methods directly (dict.__getitem__, dict.values) or pickling
+    are not supported.
+    """
+    __slots__ = ('_converters', '_converted')
+
+    def __init__(self, values, converters):
+        dict.__init__(self, values)
+        # shared by all rows of a response, _converted is created on first conversion
+        self._converters = converters
+        self._converted = None
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if key in self._converters and value is not None:
+            if self._converted is None:
+                self._converted = set()
+            if key not in self._converted:
+                value = self._converters[key](value)
+                dict.__setitem__(self, key, value)
+                self._converted.add(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def convert_all(self):
+        for key in self._converters:
+            if key in self:
+                self[key]
+        return self
+
+    def __iter__(self):
+        # overriding __iter__ makes dict(row), {**row} and update read the values
+        # through __getitem__ instead of copying the raw ones
+        return dict.__iter__(self)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def items(self):
+        return dict.items(self.convert_all())
+
+    def values(self):
+        return dict.values(self.convert_all())
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def popitem(self):
+        return dict.popitem(self.convert_all())
+
+    def copy(self):
+        return dict(self.items())
+
+    def __setitem__(self, key, value):
+        if self._converted is None:
+            self._converted = set()
+        self._converted.add(key)
+        dict.__setitem__(self, key, value)
+
+    def __repr__(self):
+        return dict.__repr__(self.convert_all())
+
+    def __eq__(self, other):
+        return dict.__eq__(self.convert_all(), other)
+
+    __hash__ = None
+
+def typed_row_decoder(column_metadata, which_columns=None, row_factory="dict"):
+    """
+    Like row_decoder, but rows with columns that have a typed conversion are
+    returned as TypedRow. Compact rows (any other row_factory) hold the
+    converted values instead.
+    """
+    converters = {}
+    for metadata in column_metadata:
+        if which_columns is not None and metadata['name'] not in which_columns:
+            continue
+        converter = _type_converter(metadata)
+        if converter is not None:
+            converters[metadata['name']] = converter
+    if not converters:
+        return row_decoder(column_metadata, which_columns, row_factory)
+    if row_factory != "dict":
+        return _cached_row_decoder(column_metadata, which_columns, row_factory, converters)
+    decode_row = row_decoder(column_metadata, which_columns)
+    return lambda record: TypedRow(decode_row(record), converters)
+
+def _type_converter(metadata):
+    type_name = (metadata.get('typeName') or "").split(" ")[0].upper()
+    if type_name in ("DECIMAL", "NUMERIC"):
+        # the Data API sends the digits at the scale of the column, up to the 65 of MySQL,
+        # Decimal keeps them all (rounding to a scale would use the 28 digits of the context)
+        return decimal.Decimal
+    if type_name in ("DATETIME", "TIMESTAMP"):
+        return _parse_datetime
+    if type_name == "DATE":
+        return _parse_date
+    if type_name == "JSON":
+        return json.loads
+    if _VALUE_FIELDS.get(type_name) == "blobValue":
+        return memoryview
+    return None
+
+def _is_zero_date(value):
+    # MySQL zero dates '0000-00-00' and dates with a zero month or day have no python date
+    return value[:4] == "0000" or value[5:7] == "00" or value[8:10] == "00"
+
+def _parse_date(value):
+    if _is_zero_date(value):
+        return None
+    return datetime.date.fromisoformat(value)
+
+def _parse_datetime(value):
+    # the Data API sends 'YYYY-MM-DD HH:MM:SS[.fraction]' with a fraction of any length
+    if _is_zero_date(value):
+        return None
+    seconds, _, fraction = value.partition(".")
+    parsed = datetime.datetime.strptime(seconds, "%Y-%m-%d %H:%M:%S")
+    if fraction:
+        parsed = parsed.replace(microsecond=int(fraction[:6].ljust(6, "0")))
+    return parsed
+
+def iter_rows(sql_statement, parameters=None, page_size=1000, key_column=None,
+        which_columns=None, prefetch=False, typed=False, row_factory="dict"):
+    """
+    Yield the rows of a select statement as python dicts, one page at a time.
+    With key_column the pages are read by keyset pagination on that unique and
+    selected column, named as in the where clause of the statement (e.g. s.sID).
+    The statement must not have its own order by, limit or union then.
+    Otherwise pages are read by LIMIT/OFFSET in the order of the statement, with
+    all columns as tie-breakers so that pages neither overlap nor miss rows; a
+    limit without order by or in a subquery raises ValueError. Every offset page
+    sorts the whole result, key_column is much cheaper for large results.
+    Only one page is held in memory, which also keeps every response below the
+    Data API size limit. With prefetch the next page is fetched on a background
+    thread while the current one is consumed. typed and row_factory work as in
+    to_python_dict.
+    """
+    if parameters is None:
+        parameters = []
+    elif isinstance(parameters, dict):
+        sql_statement, parameters = expand_in_lists(sql_statement, parameters)
+        parameters = bind_parameters(parameters)
+    sql_statement = sql_statement.strip().rstrip(';')
+    if key_column is None:
+        fetch = _offset_pages(sql_statement, parameters, page_size)
+    else:
+        fetch = _keyset_pages(sql_statement, parameters, page_size, key_column)
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch(None)
+        column_names = [metadata['name'] for metadata in page["columnMetadata"]]
+        if typed:
+            decode_row = typed_row_decoder(page["columnMetadata"], which_columns, row_factory)
+        else:
+            decode_row = row_decoder(page["columnMetadata"], which_columns, row_factory)
+        cursor = None
+        while True:
+            records = page["records"]
+            if len(records) < page_size:
+                cursor = None
+            else:
+                cursor = _next_cursor(cursor, records, column_names, key_column, page_size)
+            next_page = None
+            if cursor is not None and executor is not None:
+                next_page = executor.submit(fetch, cursor)
+            for record in records:
+                yield decode_row(record)
+            if cursor is None:
+                return
+            page = next_page.result() if next_page is not None else fetch(cursor)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+def export_to_s3(sql_statement, bucket, key, key_column, format="ndjson", **kwargs):
+    """
+    Stream the rows of a select statement to s3://bucket/key as NDJSON or CSV,
+    read in pages ordered by key_column. See aurora.export.export_to_s3 for the options.
+    """
+    # imported here, only exports need the s3 client
+    from aurora.export import export_to_s3 as export
+    return export(sql_statement, bucket, key, key_column, format, **kwargs)
+
+def _offset_pages(sql_statement, parameters, page_size):
+    # Return fetch(offset) reading the pages of the statement by LIMIT/OFFSET in a
+    # total order, see _in_total_order. Limit and offset are parameters, so every
+    # page has the same sql and schema cache entry.
+    split = _top_level_limit(sql_statement)
+    ordered = None
+    if split is not None:
+        # the column count decides the tie-breakers, a limit 0 statement returns it
+        column_metadata = my_execute_statement(f"{split[0]} limit 0", parameters)["columnMetadata"]
+        ordered = _in_total_order(sql_statement, len(column_metadata))
+    if ordered is None:
+        raise ValueError("a statement with a limit without order by or in a subquery cannot be "
+                         "read in pages by offset, pass a key_column")
+    ordered_sql, start, count = ordered
+    page_sql = f"{ordered_sql} limit :aurora_limit offset :aurora_offset"
+
+    def fetch(cursor):
+        offset = cursor or 0
+        limit = page_size if count is None else max(0, min(page_size, count - offset))
+        return my_execute_statement(page_sql, parameters + [
+            {'name': 'aurora_limit', 'value': {'longValue': limit}},
+            {'name': 'aurora_offset', 'value': {'longValue': start + offset}}])
+    return fetch
+
+# top-level clauses which end the where clause of a select
+_WHERE = re.compile(r"\bwhere\b", re.IGNORECASE)
+_AFTER_WHERE = re.compile(r"\b(?:group\s+by|having|window)\b", re.IGNORECASE)
+_UNION = re.compile(r"\bunion\b", re.IGNORECASE)
+
+def _keyset_pages(sql_statement, parameters, page_size, key_column):
+    # Return fetch(cursor) reading the pages of the statement ordered by key_column,
+    # after the key of the cursor parameter. The predicate and order by are added to
+    # the statement itself: MySQL materialises derived tables, a wrapped statement
+    # would be read completely for every page.
+    top_level = _top_level_sql(_mask_quoted(sql_statement))
+    if _ORDER_BY.search(top_level) or _LIMIT.search(top_level) or _UNION.search(top_level):
+        raise ValueError("keyset pagination orders by key_column, the statement must not have "
+                         "a top-level order by, limit or union")
+    end = _AFTER_WHERE.search(top_level)
+    end = len(sql_statement) if end is None else end.start()
+    head, tail = sql_statement[:end].rstrip(), sql_statement[end:]
+    where = _WHERE.search(top_level, 0, end)
+    if where is None:
+        after_head = f"{head} where {key_column} > :aurora_after"
+    else:
+        after_head = (f"{head[:where.end()]} ({head[where.end():].strip()}) "
+                      f"and {key_column} > :aurora_after")
+    order = f" order by {key_column} limit {page_size}"
+    first_sql = f"{head} {tail}".rstrip() + order
+    after_sql = f"{after_head} {tail}".rstrip() + order
+
+    def fetch(cursor):
+        if cursor is None:
+            return my_execute_statement(first_sql, parameters)
+        return my_execute_statement(after_sql, parameters + [cursor])
+    return fetch
+
+def _next_cursor(cursor, records, column_names, key_column, page_size):
+    # the offset of the next page, or the key of the last row as parameter
+    if key_column is None:
+        return (cursor or 0) + page_size
+    # s.sID or `sID` is the column sID of the result
+    last_key = records[-1][column_names.index(key_column.split(".")[-1].strip("`"))]
+    if "isNull" in last_key:
+        raise ValueError(f"key_column {key_column} must not be null for keyset pagination")
+    return {'name': 'aurora_after', 'value': last_key}
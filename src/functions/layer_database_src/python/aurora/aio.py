@@ -0,0 +1,66 @@
+# asyncio front-end for aurora. The Data API calls stay blocking botocore calls,
+# they run on a bounded thread pool of the container which shares the pooled client:
+#
+#     shows, counts = asyncio.run(aurora.aio.gather_statements([
+#         "select sID, sName from shows",
+#         ("select count(*) from shows where picCounter > :n", {'n': 0}),
+#     ]))
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import aurora
+
+# threads for Data API calls of this container, more than pooled connections would only queue
+DBAsyncWorkers = int(os.environ.get("DBAsyncWorkers", str(aurora.DBMaxPoolConnections)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """
+    Return the thread pool of this container, created on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DBAsyncWorkers,
+                                               thread_name_prefix="aurora-aio")
+    return _executor
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Run a blocking aurora function on the thread pool and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(function, *args, **kwargs))
+
+async def execute(sql_statement, parameters=None, transaction_id=None):
+    """
+    Execute one sql statement, parameters as for aurora.simple_call_rds_data_api.
+    """
+    if parameters is None:
+        parameters = []
+    return await run_blocking(aurora.my_execute_statement, sql_statement, parameters, transaction_id)
+
+async def execute_named(name, values=None, transaction_id=None):
+    return await run_blocking(aurora.execute_named, name, values, transaction_id)
+
+async def batch_execute(sql_statement, param_sets, max_workers=1):
+    return await run_blocking(aurora.batch_execute, sql_statement, param_sets, max_workers)
+
+async def gather_statements(statements):
+    """
+    Execute independent statements concurrently and return their responses in order.
+    A statement is a sql string or a (sql, parameters) tuple.
+    """
+    calls = []
+    for statement in statements:
+        if isinstance(statement, str):
+            calls.append(execute(statement))
+        else:
+            calls.append(execute(*statement))
+    return list(await asyncio.gather(*calls))
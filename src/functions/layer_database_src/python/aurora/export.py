@@ -0,0 +1,161 @@
+# Export of query results to S3, see export_to_s3. Pages of the result are read
+# with aurora.iter_rows, encoded and uploaded as parts of a multipart upload while
+# the next page is fetched, so memory stays at a few parts whatever the result size.
+import io
+import csv
+import json
+import time
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+import aurora
+
+# S3 parts have to be at least 5 MiB, except for the last one
+MIN_PART_BYTES = 5 * 1024 * 1024
+DEFAULT_PART_BYTES = 8 * 1024 * 1024
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """
+    Return the s3 client of this container, created on first use.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.session.Session().client('s3')
+    return _s3_client
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    return str(value)
+
+class _NdjsonEncoder:
+    def __init__(self):
+        self._encode = json.JSONEncoder(default=_json_default, separators=(",", ":")).encode
+
+    def encode(self, rows):
+        return "".join(self._encode(row) + "\n" for row in rows)
+
+class _CsvEncoder:
+    # the header is written with the first batch of rows, blobs are base64 encoded
+    def __init__(self):
+        self._columns = None
+
+    def encode(self, rows):
+        if not rows:
+            return ""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._columns is None:
+            self._columns = list(rows[0])
+            writer.writerow(self._columns)
+        for row in rows:
+            writer.writerow([_json_default(value) if isinstance(value, (bytes, bytearray, memoryview))
+                             else value for value in row.values()])
+        return buffer.getvalue()
+
+_ENCODERS = {'ndjson': _NdjsonEncoder, 'csv': _CsvEncoder}
+
+class MultipartWriter:
+    """
+    Collects bytes and uploads them to s3 as parts of at least part_bytes, on up
+    to max_concurrency threads. Small objects are uploaded with one put_object.
+    """
+    def __init__(self, bucket, key, part_bytes=DEFAULT_PART_BYTES, max_concurrency=2,
+            content_type="application/octet-stream", s3_client=None):
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = max(part_bytes, MIN_PART_BYTES)
+        self.content_type = content_type
+        self.bytes = 0
+        self._s3 = s3_client if s3_client is not None else get_s3_client()
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self._max_concurrency = max_concurrency
+        self._executor = None
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes += len(data)
+        if len(self._buffer) >= self.part_bytes:
+            self._upload_part(bytes(self._buffer))
+            self._buffer = bytearray()
+
+    def close(self):
+        """
+        Upload what is left and complete the upload. Returns the number of parts.
+        """
+        if self._upload_id is None:
+            self._s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                                ContentType=self.content_type)
+            return 1
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+        parts = [{'PartNumber': number, 'ETag': future.result()['ETag']}
+                 for number, future in enumerate(self._parts, start=1)]
+        self._executor.shutdown()
+        self._s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                           MultipartUpload={'Parts': parts})
+        return len(parts)
+
+    def abort(self):
+        if self._upload_id is not None:
+            self._executor.shutdown(wait=True)
+            self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+    def _upload_part(self, body):
+        if self._upload_id is None:
+            self._upload_id = self._s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type)['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self._max_concurrency,
+                                                thread_name_prefix="aurora-export")
+        # wait for older parts so that at most max_concurrency parts are held in memory
+        if len(self._parts) >= self._max_concurrency:
+            self._parts[-self._max_concurrency].result()
+        self._parts.append(self._executor.submit(
+            self._s3.upload_part, Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=len(self._parts) + 1, Body=body))
+
+def export_to_s3(sql_statement, bucket, key, key_column, format="ndjson", parameters=None,
+        page_size=1000, typed=False, part_bytes=DEFAULT_PART_BYTES, max_concurrency=2, s3_client=None):
+    """
+    Write the rows of a select statement to s3://bucket/key as NDJSON ('ndjson') or
+    CSV with a header ('csv'). The statement is read page by page by keyset
+    pagination on key_column as in aurora.iter_rows, which reads every row once
+    and each page by index, with the next page prefetched. Every page is encoded
+    right away and uploaded in parts of part_bytes.
+    Returns rows, bytes, parts and seconds of the export.
+    """
+    if key_column is None:
+        raise ValueError("exports are read by keyset pagination, key_column is required")
+    if format not in _ENCODERS:
+        raise ValueError(f"format {format} not supported, has to be one of {sorted(_ENCODERS)}")
+    start = time.perf_counter()
+    encoder = _ENCODERS[format]()
+    content_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    writer = MultipartWriter(bucket, key, part_bytes, max_concurrency, content_type, s3_client)
+    rows = 0
+    page = []
+    try:
+        for row in aurora.iter_rows(sql_statement, parameters, page_size=page_size,
+                                    key_column=key_column, prefetch=True, typed=typed):
+            page.append(row)
+            if len(page) >= page_size:
+                writer.write(encoder.encode(page).encode("utf-8"))
+                rows += len(page)
+                page = []
+        writer.write(encoder.encode(page).encode("utf-8"))
+        rows += len(page)
+        parts = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return {'rows': rows, 'bytes': writer.bytes, 'parts': parts, 'seconds': time.perf_counter() - start}
@@ -0,0 +1,194 @@
+# A local stand-in for the RDS Data API backed by SQLite, to run and benchmark
+# aurora and the handlers using it without network or cluster:
+#
+#     client = aurora.local.install()
+#     client.run_script("create table shows (sID integer primary key, sName text)")
+#     aurora.simple_call_rds_data_api("select sID, sName from shows")
+#
+# Requests and responses have the shape of the rds-data client of boto3. The sql is
+# run by SQLite, so MySQL specific syntax beyond LAST_INSERT_ID() and FROM DUAL is
+# not translated.
+import re
+import json
+import uuid
+import sqlite3
+import threading
+import itertools
+
+from botocore.exceptions import ClientError
+
+import aurora
+
+# the Data API fails responses above 1 MiB
+MAX_RESPONSE_BYTES = 1024 * 1024
+
+_LAST_INSERT_ID = re.compile(r"\bLAST_INSERT_ID\s*\(\s*\)", re.IGNORECASE)
+# SQLite selects without FROM where MySQL needs FROM DUAL
+_FROM_DUAL = re.compile(r"\s+FROM\s+DUAL\b", re.IGNORECASE)
+# typeName and java.sql.Types code reported in columnMetadata, by python type of the values
+_COLUMN_TYPES = {int: ("BIGINT", -5), float: ("DOUBLE", 8), str: ("VARCHAR", 12),
+                 bytes: ("BLOB", 2004), type(None): ("NULL", 0)}
+_memory_databases = itertools.count()
+
+class LocalDataApiClient:
+    """
+    Implements execute_statement, batch_execute_statement and the transaction
+    calls of the rds-data client on one SQLite database. database is a file
+    path or ':memory:'. Every transaction uses its own connection.
+    """
+    def __init__(self, database=":memory:", max_response_bytes=MAX_RESPONSE_BYTES):
+        if database == ":memory:":
+            # a shared in-memory database lives as long as one of its connections
+            database = f"file:aurora-local-{next(_memory_databases)}?mode=memory&cache=shared"
+        self.database = database
+        self.max_response_bytes = max_response_bytes
+        self._connection = self._connect()
+        self._lock = threading.Lock()
+        self._transactions = {}
+
+    def _connect(self):
+        # isolation_level None: autocommit, transactions are begun explicitly
+        return sqlite3.connect(self.database, uri=self.database.startswith("file:"),
+                               isolation_level=None, check_same_thread=False)
+
+    def run_script(self, sql_script):
+        """
+        Run several ';' separated statements, e.g. to create and fill tables.
+        """
+        with self._lock:
+            self._connection.executescript(sql_script)
+
+    def execute_statement(self, sql, parameters=None, includeResultMetadata=False,
+            transactionId=None, **kwargs):
+        with self._connection_for(transactionId, 'ExecuteStatement') as connection:
+            cursor = self._execute(connection, sql, _sqlite_parameters(parameters), 'ExecuteStatement')
+            response = {'numberOfRecordsUpdated': max(cursor.rowcount, 0), 'generatedFields': []}
+            if cursor.description is not None:
+                rows = cursor.fetchall()
+                response['records'] = [[_field(value) for value in row] for row in rows]
+                if includeResultMetadata:
+                    response['columnMetadata'] = _column_metadata(cursor.description, rows)
+                self._check_response_size(response['records'])
+            elif cursor.lastrowid and sql.lstrip()[:6].lower() in ("insert", "replac"):
+                response['generatedFields'] = [{'longValue': cursor.lastrowid}]
+        return response
+
+    def batch_execute_statement(self, sql, parameterSets=None, transactionId=None, **kwargs):
+        update_results = []
+        with self._connection_for(transactionId, 'BatchExecuteStatement') as connection:
+            for parameters in parameterSets or [[]]:
+                cursor = self._execute(connection, sql, _sqlite_parameters(parameters),
+                                       'BatchExecuteStatement')
+                generated_fields = []
+                if cursor.lastrowid and sql.lstrip()[:6].lower() in ("insert", "replac"):
+                    generated_fields = [{'longValue': cursor.lastrowid}]
+                update_results.append({'generatedFields': generated_fields})
+        return {'updateResults': update_results}
+
+    def begin_transaction(self, **kwargs):
+        transaction_id = uuid.uuid4().hex
+        connection = self._connect()
+        connection.execute("BEGIN")
+        self._transactions[transaction_id] = (connection, threading.Lock())
+        return {'transactionId': transaction_id}
+
+    def commit_transaction(self, transactionId, **kwargs):
+        self._end_transaction(transactionId, "COMMIT", 'CommitTransaction')
+        return {'transactionStatus': "Transaction Committed"}
+
+    def rollback_transaction(self, transactionId, **kwargs):
+        self._end_transaction(transactionId, "ROLLBACK", 'RollbackTransaction')
+        return {'transactionStatus': "Rollback Complete"}
+
+    def _end_transaction(self, transaction_id, command, operation):
+        if transaction_id not in self._transactions:
+            raise _error(f"Transaction {transaction_id} is not found", operation, 'NotFoundException')
+        connection, lock = self._transactions.pop(transaction_id)
+        with lock:
+            try:
+                connection.execute(command)
+            finally:
+                connection.close()
+
+    def _connection_for(self, transaction_id, operation):
+        if transaction_id is None:
+            return _Locked(self._connection, self._lock)
+        if transaction_id not in self._transactions:
+            raise _error(f"Transaction {transaction_id} is not found", operation, 'NotFoundException')
+        return _Locked(*self._transactions[transaction_id])
+
+    def _execute(self, connection, sql, parameters, operation):
+        try:
+            sql = _FROM_DUAL.sub("", _LAST_INSERT_ID.sub("last_insert_rowid()", sql))
+            return connection.execute(sql, parameters)
+        except sqlite3.Error as error:
+            raise _error(str(error), operation)
+
+    def _check_response_size(self, records):
+        if self.max_response_bytes is not None and \
+                len(json.dumps(records, default=_blob_size)) > self.max_response_bytes:
+            raise _error("Database returned more than the allowed response size limit",
+                         'ExecuteStatement')
+
+class _Locked:
+    # a connection used by one call at a time
+    def __init__(self, connection, lock):
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self.connection
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+def _error(message, operation, code='BadRequestException'):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+def _sqlite_parameters(parameters):
+    values = {}
+    for parameter in parameters or []:
+        value = parameter['value']
+        if value.get('isNull'):
+            values[parameter['name']] = None
+        elif 'booleanValue' in value:
+            values[parameter['name']] = int(value['booleanValue'])
+        else:
+            values[parameter['name']] = next(iter(value.values()))
+    return values
+
+def _field(value):
+    if value is None:
+        return {'isNull': True}
+    if isinstance(value, int):
+        return {'longValue': value}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, bytes):
+        return {'blobValue': value}
+    return {'stringValue': str(value)}
+
+def _blob_size(blob):
+    return "=" * (4 * len(blob) // 3 + 4)
+
+def _column_metadata(description, rows):
+    column_metadata = []
+    for index, column in enumerate(description):
+        # SQLite columns have no fixed type, report the type of the first value which is not null
+        value_type = next((type(row[index]) for row in rows if row[index] is not None), str)
+        type_name, type_code = _COLUMN_TYPES.get(value_type, ("VARCHAR", 12))
+        column_metadata.append({'name': column[0], 'label': column[0], 'typeName': type_name,
+                                'type': type_code, 'nullable': 1, 'precision': 0, 'scale': 0})
+    return column_metadata
+
+def install(database=":memory:", max_response_bytes=MAX_RESPONSE_BYTES):
+    """
+    Make aurora send every statement to a new LocalDataApiClient and return it.
+    """
+    client = LocalDataApiClient(database, max_response_bytes)
+    aurora.set_client_factory(lambda region_name, config, tcp_keepalive: client)
+    return client
+
+def uninstall():
+    aurora.set_client_factory(None)
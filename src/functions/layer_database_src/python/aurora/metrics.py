@@ -0,0 +1,162 @@
+# Per-statement metrics of aurora, emitted as CloudWatch Embedded Metric Format.
+# Statements are recorded into a buffer which flush writes as one EMF log line per
+# statement fingerprint, so a Lambda invocation costs a few log lines and no API calls:
+# https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+import os
+import json
+import time
+import threading
+import functools
+
+DBMetrics = os.environ.get("DBMetrics", "false").lower() == "true"
+DBMetricsNamespace = os.environ.get("DBMetricsNamespace", "aurora")
+
+# EMF allows 100 values per metric and log line
+_MAX_VALUES = 100
+# CloudWatch dimension values may have 1024 characters
+_MAX_DIMENSION_LENGTH = 1024
+_UNITS = {'WallTime': "Milliseconds", 'HttpTime': "Milliseconds", 'DecodeTime': "Milliseconds",
+          'Rows': "Count", 'ResponseBytes': "Bytes"}
+
+_entries = []
+_entries_lock = threading.Lock()
+# http time and bytes of the statement running on this thread, see instrument_client
+_http = threading.local()
+# the entry of the last statement of this thread, decode times are added to it
+_last = threading.local()
+
+def _print_sink(line):
+    print(line, flush=True)
+
+_sink = _print_sink
+
+def set_sink(sink):
+    """
+    Send the EMF lines to sink (a callable taking one str) instead of stdout.
+    """
+    global _sink
+    _sink = sink
+
+def enable(namespace=None):
+    global DBMetrics, DBMetricsNamespace
+    DBMetrics = True
+    if namespace is not None:
+        DBMetricsNamespace = namespace
+
+def disable():
+    global DBMetrics
+    DBMetrics = False
+
+def instrument_client(client):
+    """
+    Measure the time between sending a request and receiving its response and the
+    size of the response body of client, for the statement running on the thread.
+    """
+    client.meta.events.register('before-send.rds-data', _before_send, unique_id='aurora-metrics-send')
+    client.meta.events.register('response-received.rds-data', _response_received,
+                                unique_id='aurora-metrics-received')
+
+def _before_send(request, **kwargs):
+    _http.sent = time.perf_counter()
+
+def _response_received(response_dict, **kwargs):
+    sent = getattr(_http, 'sent', None)
+    if sent is None:
+        return
+    _http.time = getattr(_http, 'time', 0.0) + time.perf_counter() - sent
+    if response_dict is not None:
+        _http.bytes = getattr(_http, 'bytes', 0) + len(response_dict.get('body') or b"")
+
+def start_statement():
+    _http.sent = None
+    _http.time = 0.0
+    _http.bytes = 0
+
+def record_statement(fingerprint, wall_time, response):
+    """
+    Buffer the metrics of one statement. HttpTime (the http round trips as seen
+    by the client, not the time spent in the database) and response bytes add
+    up all http requests since start_statement, retries included.
+    """
+    entry = {'Statement': fingerprint[:_MAX_DIMENSION_LENGTH],
+             'WallTime': wall_time * 1000,
+             'HttpTime': getattr(_http, 'time', 0.0) * 1000,
+             'ResponseBytes': getattr(_http, 'bytes', 0),
+             'Rows': _rows(response)}
+    with _entries_lock:
+        _entries.append(entry)
+    _last.response_id = id(response)
+    _last.entry = entry
+
+def _rows(response):
+    # rows read, rows written or parameter sets of a batch
+    if "records" in response:
+        return len(response["records"])
+    if "updateResults" in response:
+        return len(response["updateResults"])
+    return response.get("numberOfRecordsUpdated", 0)
+
+def record_decode(response, decode_time):
+    """
+    Add the time it took to decode response to the entry of its statement. Only the
+    last statement of a thread is known, which is the usual execute-then-decode.
+    """
+    if getattr(_last, 'response_id', None) == id(response):
+        entry = _last.entry
+        entry['DecodeTime'] = entry.get('DecodeTime', 0.0) + decode_time * 1000
+
+def flush():
+    """
+    Write the buffered entries to the sink as EMF lines and empty the buffer.
+    """
+    with _entries_lock:
+        entries = list(_entries)
+        del _entries[:]
+    _last.response_id = None
+    for line in emf_lines(entries):
+        _sink(line)
+
+def emf_lines(entries, namespace=None, timestamp=None):
+    """
+    Group entries by statement and format them as EMF JSON lines.
+    """
+    if namespace is None:
+        namespace = DBMetricsNamespace
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    values_by_statement = {}
+    for entry in entries:
+        values = values_by_statement.setdefault(entry['Statement'], {name: [] for name in _UNITS})
+        for name in _UNITS:
+            if name in entry:
+                values[name].append(entry[name])
+    lines = []
+    for statement, values in values_by_statement.items():
+        longest = max(len(metric_values) for metric_values in values.values())
+        for start in range(0, longest, _MAX_VALUES):
+            metrics = {name: metric_values[start:start + _MAX_VALUES]
+                       for name, metric_values in values.items() if metric_values[start:start + _MAX_VALUES]}
+            document = {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': namespace,
+                        'Dimensions': [["Statement"]],
+                        'Metrics': [{'Name': name, 'Unit': _UNITS[name]} for name in metrics]}]},
+                'Statement': statement}
+            document.update(metrics)
+            lines.append(json.dumps(document))
+    return lines
+
+def flushing(handler):
+    """
+    Decorate a Lambda handler so that the metrics are flushed once per invocation.
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        try:
+            return handler(event, context)
+        finally:
+            if DBMetrics:
+                flush()
+    return wrapper
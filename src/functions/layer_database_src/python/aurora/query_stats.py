@@ -0,0 +1,186 @@
+# Running statistics per statement fingerprint, in the spirit of pg_stat_statements:
+# calls, errors, total/min/max time, rows, response bytes and a latency histogram for
+# every fingerprint aurora executed in this container. summary returns them, dump
+# writes them as JSON lines, on demand or (with DBQueryStatsAtExit) when the container
+# shuts down, see _install_sigterm_handler.
+import os
+import json
+import atexit
+import signal
+import threading
+
+from aurora import metrics
+
+DBQueryStats = os.environ.get("DBQueryStats", "true").lower() == "true"
+# fingerprints kept, the one with the fewest calls is dropped for a new one
+DBQueryStatsMaxFingerprints = int(os.environ.get("DBQueryStatsMaxFingerprints", "500"))
+DBQueryStatsAtExit = os.environ.get("DBQueryStatsAtExit", "false").lower() == "true"
+
+# histogram buckets: exact below 2**_SUB_BUCKET_BITS microseconds, above that
+# 2**(_SUB_BUCKET_BITS - 1) buckets per power of two, i.e. about 3 % relative error
+_SUB_BUCKET_BITS = 6
+_HALF_SUB_BUCKETS = 1 << (_SUB_BUCKET_BITS - 1)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in the manner of HdrHistogram, with a
+    bounded relative error and sparse buckets. Values are recorded in seconds.
+    """
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+
+    def record(self, seconds):
+        index = _bucket_index(int(seconds * 1e6))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def percentile(self, percent):
+        """
+        Return the highest latency (in seconds) of the bucket holding the given
+        percentile, or None if nothing was recorded.
+        """
+        if not self.total:
+            return None
+        rank = max(1, -(-self.total * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return _bucket_upper(index) / 1e6
+        return _bucket_upper(max(self.counts)) / 1e6
+
+def _bucket_index(micros):
+    if micros < 2 * _HALF_SUB_BUCKETS:
+        return max(micros, 0)
+    shift = micros.bit_length() - _SUB_BUCKET_BITS
+    return shift * _HALF_SUB_BUCKETS + (micros >> shift)
+
+def _bucket_upper(index):
+    if index < 2 * _HALF_SUB_BUCKETS:
+        return index
+    shift, sub_bucket = divmod(index, _HALF_SUB_BUCKETS)
+    return ((sub_bucket + _HALF_SUB_BUCKETS + 1) << (shift - 1)) - 1
+
+class FingerprintStats:
+    """
+    Aggregates of one statement fingerprint.
+    """
+    __slots__ = ('calls', 'errors', 'total_time', 'min_time', 'max_time', 'rows', 'bytes', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.min_time = None
+        self.max_time = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.histogram = LatencyHistogram()
+
+    def as_dict(self):
+        return {'calls': self.calls,
+                'errors': self.errors,
+                'total_time': self.total_time,
+                'mean_time': self.total_time / self.calls if self.calls else 0.0,
+                'min_time': self.min_time,
+                'max_time': self.max_time,
+                'p50_time': self.histogram.percentile(50),
+                'p90_time': self.histogram.percentile(90),
+                'p99_time': self.histogram.percentile(99),
+                'rows': self.rows,
+                'bytes': self.bytes}
+
+def enable():
+    global DBQueryStats
+    DBQueryStats = True
+
+def disable():
+    global DBQueryStats
+    DBQueryStats = False
+
+def record(fingerprint, elapsed, response):
+    """
+    Add one execution of fingerprint which took elapsed seconds. response is
+    None for a failed execution. Response bytes are the http bytes counted by
+    aurora.metrics since its start_statement.
+    """
+    with _stats_lock:
+        stats = _stats.get(fingerprint)
+        if stats is None:
+            if len(_stats) >= DBQueryStatsMaxFingerprints:
+                del _stats[min(_stats, key=lambda key: _stats[key].calls)]
+            stats = _stats[fingerprint] = FingerprintStats()
+        stats.calls += 1
+        stats.total_time += elapsed
+        if stats.min_time is None or elapsed < stats.min_time:
+            stats.min_time = elapsed
+        if elapsed > stats.max_time:
+            stats.max_time = elapsed
+        stats.histogram.record(elapsed)
+        if response is None:
+            stats.errors += 1
+        else:
+            stats.rows += metrics._rows(response)
+            stats.bytes += getattr(metrics._http, 'bytes', 0)
+
+def summary(order_by="total_time", limit=None):
+    """
+    Return the statistics of every fingerprint as dicts with a 'fingerprint' key,
+    sorted by order_by (descending), the first limit of them if limit is given.
+    """
+    with _stats_lock:
+        entries = [dict(stats.as_dict(), fingerprint=fingerprint) for fingerprint, stats in _stats.items()]
+    entries.sort(key=lambda entry: entry[order_by] or 0, reverse=True)
+    return entries if limit is None else entries[:limit]
+
+def dump(sink=None, order_by="total_time", limit=None):
+    """
+    Write the summary as one JSON line per fingerprint to sink (a callable taking
+    one str, print by default).
+    """
+    if sink is None:
+        sink = lambda line: print(line, flush=True)
+    for entry in summary(order_by, limit):
+        sink(json.dumps(dict(entry, type="aurora_query_stats")))
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+_dumped_at_exit = False
+_previous_sigterm_handler = None
+
+def _dump_at_exit():
+    global _dumped_at_exit
+    if DBQueryStatsAtExit and _stats and not _dumped_at_exit:
+        _dumped_at_exit = True
+        dump()
+
+def _dump_on_sigterm(signum, frame):
+    _dump_at_exit()
+    previous = _previous_sigterm_handler
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        # the default action ends the process, as it would have without this handler
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+def _install_sigterm_handler():
+    # Lambda shuts a container down with SIGTERM, whose default action skips atexit.
+    # It only sends it (and waits up to 500 ms) when an extension is registered for
+    # the function; without one the container is frozen and killed, nothing runs
+    # and dump has to be called from the handler instead.
+    global _previous_sigterm_handler
+    if threading.current_thread() is threading.main_thread():
+        _previous_sigterm_handler = signal.signal(signal.SIGTERM, _dump_on_sigterm)
+
+atexit.register(_dump_at_exit)
+if DBQueryStatsAtExit:
+    _install_sigterm_handler()
@@ -0,0 +1,192 @@
+# Read-through cache of Data API responses, see aurora.enable_result_cache.
+# Entries expire after the ttl of their statement, the least recently used entry
+# is evicted when the cache is full and writes drop the entries of their tables.
+# Table names are read from the sql; a write whose tables are not known drops all.
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# a table name, optionally with database and backticks
+_NAME = re.compile(r"[`\w.$]+")
+# words which follow a table reference but are no alias
+_NO_ALIAS = ("where|join|inner|left|right|cross|natural|straight_join|outer|on|using|group|order|"
+             "limit|having|union|set|for|lock|window|procedure|into|partition|use|ignore|force|"
+             "values|select")
+_TABLE = rf"[`\w.$]+(?:\s+(?:as\s+)?(?!(?:{_NO_ALIAS})\b)\w+)?"
+# the comma separated table references after from, join, using (of delete) and update
+_TABLE_LISTS = re.compile(rf"\b(?:from|join|using|update)\s+({_TABLE}(?:\s*,\s*{_TABLE})*)", re.IGNORECASE)
+_LEADING_COMMENTS = re.compile(r"(?:\s+|/\*.*?\*/|(?:--|#)[^\n]*)*", re.DOTALL)
+_INSERT = re.compile(r"(?:insert|replace)\s+(?:(?:low_priority|delayed|high_priority|ignore)\s+)*"
+                     r"(?:into\s+)?([`\w.$]+)", re.IGNORECASE)
+_UPDATE = re.compile(r"update\s+(?:(?:low_priority|ignore)\s+)*(.*?)\bset\b", re.IGNORECASE | re.DOTALL)
+_DDL = re.compile(r"(?:truncate(?:\s+table)?|alter\s+(?:ignore\s+)?table|"
+                  r"drop\s+(?:temporary\s+)?table(?:\s+if\s+exists)?)\s+"
+                  r"([`\w.$]+(?:\s*,\s*[`\w.$]+)*)", re.IGNORECASE)
+# statements which write no table, by first keyword
+_NO_WRITE_KEYWORDS = ("select", "with", "show", "explain", "describe", "desc", "set")
+
+def _table_name(name):
+    # `db`.`shows`, db.shows and SHOWS all refer to the table shows
+    return name.replace("`", "").split(".")[-1].lower()
+
+def read_tables(sql_statement):
+    """
+    Tables a statement reads from: the table references after from and join,
+    comma separated lists included.
+    """
+    tables = set()
+    for match in _TABLE_LISTS.finditer(sql_statement):
+        for reference in match.group(1).split(","):
+            tables.add(_table_name(_NAME.match(reference.strip()).group(0)))
+    return frozenset(tables)
+
+def written_tables(sql_statement):
+    """
+    Tables the (possibly ';' separated) statements write to, None if a statement
+    may write to tables which cannot be told from its sql (e.g. call or load data).
+    The tables of multi-table updates and deletes are all the tables they name.
+    """
+    tables = set()
+    for part in sql_statement.split(";"):
+        part = part[_LEADING_COMMENTS.match(part).end():]
+        keyword = part.split(None, 1)[0].lstrip("(").lower() if part else ""
+        if not keyword or keyword in _NO_WRITE_KEYWORDS:
+            continue
+        part_tables = ()
+        if keyword in ("insert", "replace"):
+            match = _INSERT.match(part)
+            part_tables = [match.group(1)] if match else ()
+        elif keyword == "update":
+            match = _UPDATE.match(part)
+            part_tables = read_tables(f"update {match.group(1)}") if match else ()
+        elif keyword == "delete":
+            part_tables = read_tables(part)
+        else:
+            match = _DDL.match(part)
+            part_tables = match.group(1).split(",") if match else ()
+        if not part_tables:
+            return None
+        tables.update(_table_name(name.strip()) for name in part_tables)
+    return tables
+
+class ResultCache:
+    """
+    An LRU cache of responses. ttls maps statements to their ttl in seconds,
+    default_ttl applies to the others. A ttl of 0 keeps a statement out of the cache.
+    """
+    def __init__(self, max_entries, default_ttl, ttls=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = {} if ttls is None else ttls
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # key -> (expiry time, response, tables read)
+        self._entries = OrderedDict()
+        self._keys_by_table = {}
+        self._tables_by_sql = {}
+        # invalidations per table and of the whole cache, see generation
+        self._generations = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def ttl(self, sql_statement):
+        return self.ttls.get(sql_statement, self.default_ttl)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, sql_statement):
+        """
+        Return the number of invalidations of the tables the statement reads. Pass
+        it to put with the response read afterwards: if a write invalidated one of
+        the tables in between, the response may hold the old rows and is not cached.
+        """
+        tables = self._tables(sql_statement)
+        with self._lock:
+            return self._generation_of(tables)
+
+    def put(self, key, sql_statement, response, generation=None, ttl_key=None):
+        # the ttl is looked up by ttl_key if given, e.g. the statement before IN list expansion
+        ttl = self.ttl(sql_statement if ttl_key is None else ttl_key)
+        if ttl <= 0:
+            return
+        tables = self._tables(sql_statement)
+        with self._lock:
+            if generation is not None and generation != self._generation_of(tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, response, tables)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._keys_by_table.get(table, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def invalidate_all(self):
+        """
+        Drop every entry, for writes whose tables are not known.
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        return {'size': len(self._entries), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'expirations': self.expirations, 'invalidations': self.invalidations}
+
+    def _tables(self, sql_statement):
+        tables = self._tables_by_sql.get(sql_statement)
+        if tables is None:
+            tables = read_tables(sql_statement)
+            if len(self._tables_by_sql) >= 4 * self.max_entries:
+                self._tables_by_sql.clear()
+            self._tables_by_sql[sql_statement] = tables
+        return tables
+
+    def _generation_of(self, tables):
+        # counters only grow, so the sum changes with every invalidation of a table
+        return self._generation + sum(self._generations.get(table, 0) for table in tables)
+
+    def _clear(self):
+        self._entries.clear()
+        self._keys_by_table.clear()
+        self._generation += 1
+
+    def _remove(self, key):
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
@@ -0,0 +1,186 @@
+# A slim rds-data client which signs requests with SigV4 itself and sends them over
+# a pooled urllib3 connection, without boto3. It saves importing boto3 and loading
+# the service model when a container starts:
+#
+#     aurora.sigv4.install()   # or DBTransport=sigv4 in the environment
+#
+# Requests and responses have the shape of the rds-data client of boto3 (blobs are
+# bytes, errors are botocore ClientErrors), for the operations aurora uses.
+# Credentials and region are read from the Lambda environment.
+import os
+import json
+import hmac
+import base64
+import socket
+import hashlib
+import datetime
+import threading
+
+import urllib3
+from botocore.exceptions import ClientError
+
+from aurora import metrics
+
+SERVICE = "rds-data"
+
+# request path of each operation of the Data API (rest-json protocol)
+_OPERATIONS = {
+    'ExecuteStatement': "/Execute",
+    'BatchExecuteStatement': "/BatchExecute",
+    'BeginTransaction': "/BeginTransaction",
+    'CommitTransaction': "/CommitTransaction",
+    'RollbackTransaction': "/RollbackTransaction",
+}
+
+class SigV4Client:
+    """
+    rds-data client with execute_statement, batch_execute_statement and the
+    transaction operations. region_name defaults to AWS_REGION, endpoint_url to the
+    public endpoint of the region.
+    """
+    def __init__(self, region_name=None, endpoint_url=None, max_pool_connections=10,
+            connect_timeout=5, read_timeout=60, tcp_keepalive=True):
+        self.region_name = region_name or os.environ.get("AWS_REGION") or os.environ["AWS_DEFAULT_REGION"]
+        self.endpoint_url = endpoint_url or f"https://{SERVICE}.{self.region_name}.amazonaws.com"
+        self._host = urllib3.util.parse_url(self.endpoint_url).netloc
+        socket_options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        if tcp_keepalive:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # only connecting is retried, a statement which may have reached the database is not
+        self._pool = urllib3.connectionpool.connection_from_url(
+            self.endpoint_url, maxsize=max_pool_connections, block=False,
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+            retries=urllib3.Retry(total=2, connect=2, read=0, status=0, redirect=0),
+            socket_options=socket_options)
+        self._signing_keys = {}
+        self._signing_keys_lock = threading.Lock()
+
+    def execute_statement(self, **kwargs):
+        return self._call('ExecuteStatement', kwargs)
+
+    def batch_execute_statement(self, **kwargs):
+        return self._call('BatchExecuteStatement', kwargs)
+
+    def begin_transaction(self, **kwargs):
+        return self._call('BeginTransaction', kwargs)
+
+    def commit_transaction(self, **kwargs):
+        return self._call('CommitTransaction', kwargs)
+
+    def rollback_transaction(self, **kwargs):
+        return self._call('RollbackTransaction', kwargs)
+
+    def _call(self, operation, request):
+        path = _OPERATIONS[operation]
+        # the only bytes in Data API requests are blobValues, sent base64 encoded
+        body = json.dumps(request, separators=(",", ":"), default=_encode_blob).encode("utf-8")
+        headers = self._sign(path, body)
+        metrics._before_send(None)
+        response = self._pool.urlopen("POST", path, body=body, headers=headers,
+                                      preload_content=True, assert_same_host=False)
+        data = response.data
+        metrics._response_received({'body': data})
+        metadata = {'RequestId': response.headers.get("x-amzn-RequestId", ""),
+                    'HTTPStatusCode': response.status,
+                    'HTTPHeaders': dict(response.headers), 'RetryAttempts': 0}
+        if response.status >= 300:
+            raise _client_error(operation, response, data, metadata)
+        parsed = json.loads(data) if data else {}
+        _decode_blobs(parsed)
+        parsed['ResponseMetadata'] = metadata
+        return parsed
+
+    def _sign(self, path, body):
+        access_key = os.environ["AWS_ACCESS_KEY_ID"]
+        secret_key = os.environ["AWS_SECRET_ACCESS_KEY"]
+        session_token = os.environ.get("AWS_SESSION_TOKEN")
+        now = datetime.datetime.utcnow()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        payload_hash = hashlib.sha256(body).hexdigest()
+        headers = {'content-type': "application/json", 'host': self._host, 'x-amz-date': amz_date}
+        if session_token:
+            headers['x-amz-security-token'] = session_token
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join([
+            "POST", path, "",
+            "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+            signed_headers, payload_hash])
+        scope = f"{date}/{self.region_name}/{SERVICE}/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
+        signature = hmac.new(self._signing_key(secret_key, date), string_to_sign.encode("utf-8"),
+                             hashlib.sha256).hexdigest()
+        headers['authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                                    f"SignedHeaders={signed_headers}, Signature={signature}")
+        # urllib3 sends the same host header itself
+        del headers['host']
+        return headers
+
+    def _signing_key(self, secret_key, date):
+        # the key only changes with the day and the credentials
+        key = (secret_key, date)
+        signing_key = self._signing_keys.get(key)
+        if signing_key is None:
+            signing_key = ("AWS4" + secret_key).encode("utf-8")
+            for part in (date, self.region_name, SERVICE, "aws4_request"):
+                signing_key = hmac.new(signing_key, part.encode("utf-8"), hashlib.sha256).digest()
+            with self._signing_keys_lock:
+                self._signing_keys.clear()
+                self._signing_keys[key] = signing_key
+        return signing_key
+
+def _encode_blob(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode_blobs(response):
+    # blobValues arrive base64 encoded, boto3 returns them as bytes
+    rows = list(response.get("records") or ())
+    if "generatedFields" in response:
+        rows.append(response["generatedFields"])
+    for result in response.get("updateResults") or ():
+        rows.append(result.get("generatedFields") or ())
+    for row in rows:
+        for cell in row:
+            if "blobValue" in cell:
+                cell["blobValue"] = base64.b64decode(cell["blobValue"])
+
+def _client_error(operation, response, data, metadata):
+    # the error code is the part of x-amzn-ErrorType before the colon, or __type of the body
+    try:
+        body = json.loads(data) if data else {}
+    except ValueError:
+        body = {}
+    code = response.headers.get("x-amzn-ErrorType") or body.get("__type") or str(response.status)
+    code = code.split(":")[0].split("#")[-1]
+    message = body.get("message") or body.get("Message") or ""
+    return ClientError({'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': metadata},
+                       operation)
+
+def client_factory(region_name, config, tcp_keepalive):
+    """
+    Build a SigV4Client, for aurora.set_client_factory. The pool size and timeouts
+    of config (a botocore config) are used when one is given.
+    """
+    if config is None:
+        import aurora
+        return SigV4Client(region_name, max_pool_connections=aurora.DBMaxPoolConnections,
+                           connect_timeout=aurora.DBConnectTimeout, read_timeout=aurora.DBReadTimeout,
+                           tcp_keepalive=tcp_keepalive)
+    return SigV4Client(region_name, max_pool_connections=config.max_pool_connections,
+                       connect_timeout=config.connect_timeout, read_timeout=config.read_timeout,
+                       tcp_keepalive=tcp_keepalive)
+
+def install():
+    """
+    Make aurora send every statement with a SigV4Client.
+    """
+    import aurora
+    aurora.set_client_factory(client_factory)
+
+def uninstall():
+    import aurora
+    aurora.set_client_factory(None)
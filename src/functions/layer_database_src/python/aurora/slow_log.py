@@ -0,0 +1,93 @@
+# Slow query log of aurora. Statements which take DBSlowQueryThreshold seconds or
+# longer are logged as one JSON warning with their fingerprint, timings and redacted
+# parameters. The first slow execution of a fingerprint in a container also runs
+# EXPLAIN for it and logs the plan. Failed statements are not explained.
+import os
+import json
+import logging
+import threading
+
+import aurora
+
+# seconds, an empty value turns the slow query log off
+DBSlowQueryThreshold = os.environ.get("DBSlowQueryThreshold", "1")
+DBSlowQueryThreshold = float(DBSlowQueryThreshold) if DBSlowQueryThreshold else None
+DBSlowQueryExplain = os.environ.get("DBSlowQueryExplain", "true").lower() == "true"
+
+# statements MySQL can EXPLAIN, by first keyword
+_EXPLAINABLE = ("select", "with", "insert", "replace", "update", "delete")
+
+logger = logging.getLogger(__name__)
+
+# fingerprints explained in this container
+_explained = set()
+_explained_lock = threading.Lock()
+
+def set_threshold(seconds):
+    """
+    Log statements taking at least seconds from now on, None turns the log off.
+    """
+    global DBSlowQueryThreshold
+    DBSlowQueryThreshold = seconds
+
+def record(sql_statement, fingerprint, parameters, elapsed, response, transaction_id=None):
+    """
+    Log the statement if elapsed reached the threshold. parameters are the Data
+    API parameters (None for batches), response None for a failed statement.
+    """
+    threshold = DBSlowQueryThreshold
+    if threshold is None or elapsed < threshold:
+        return
+    entry = {'type': "aurora_slow_query",
+             'fingerprint': fingerprint,
+             'elapsed': elapsed,
+             'threshold': threshold,
+             'failed': response is None,
+             'rows': None if response is None else aurora.metrics._rows(response),
+             'parameters': redact(parameters)}
+    # a failed statement is not explained, after e.g. a resume the EXPLAIN would only fail
+    # the same way and delay the error further
+    if DBSlowQueryExplain and parameters is not None and response is not None and _first_time(fingerprint):
+        entry['explain'] = explain(sql_statement, parameters, transaction_id)
+    logger.warning(json.dumps(entry, default=str))
+
+def redact(parameters):
+    """
+    Map the name of every Data API parameter to the value field (and typeHint)
+    it was sent with, without the value itself.
+    """
+    if parameters is None:
+        return None
+    redacted = {}
+    for parameter in parameters:
+        kind = next(iter(parameter.get('value') or {}), None)
+        if 'typeHint' in parameter:
+            kind = f"{kind}:{parameter['typeHint']}"
+        redacted[parameter['name']] = kind
+    return redacted
+
+def explain(sql_statement, parameters, transaction_id=None):
+    """
+    Return the EXPLAIN rows of the statement, or the error which prevented them.
+    The EXPLAIN is sent once, without waiting for a resuming cluster, and is not
+    recorded in the metrics, query stats or slow query log itself.
+    """
+    if aurora.normalise_sql(sql_statement).lstrip(" (").split(" ", 1)[0].lower() not in _EXPLAINABLE:
+        return None
+    try:
+        response = aurora._send_request(aurora._statement_request("explain " + sql_statement),
+                                        parameters, transaction_id, True, resume=False)
+        return aurora.to_python_dict(response)
+    except Exception as error:
+        return f"explain failed: {error}"
+
+def reset():
+    with _explained_lock:
+        _explained.clear()
+
+def _first_time(fingerprint):
+    with _explained_lock:
+        if fingerprint in _explained:
+            return False
+        _explained.add(fingerprint)
+        return True
@@ -0,0 +1,75 @@
+# Tests of aurora.slow_log against a real boto3 rds-data client whose requests are
+# answered by a botocore Stubber, so parameters are validated as for the Data API.
+# Run from project root directory: `python -m unittest discover tests`
+import os
+import sys
+import pathlib
+import unittest
+
+LAYER_DIRECTORY = pathlib.Path(__file__).parent.parent.joinpath(
+    "src", "functions", "layer_database_src", "python")
+sys.path.insert(0, str(LAYER_DIRECTORY))
+
+os.environ.setdefault("DBSecretsStoreArn", "arn:aws:secretsmanager:eu-central-1:123456789012:secret:test")
+os.environ.setdefault("DBAuroraClusterArn", "arn:aws:rds:eu-central-1:123456789012:cluster:test")
+os.environ.setdefault("DBName", "test")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+import boto3
+from botocore.stub import Stubber
+
+import aurora
+from aurora import slow_log
+
+SQL = "select sID, sName from shows where sID = :sID"
+PARAMETERS = [{'name': 'sID', 'value': {'longValue': 1}}]
+EXPLAIN_RESPONSE = {
+    'columnMetadata': [{'name': 'table', 'typeName': 'VARCHAR'}, {'name': 'type', 'typeName': 'VARCHAR'}],
+    'records': [[{'stringValue': "shows"}, {'stringValue': "const"}]],
+    'numberOfRecordsUpdated': 0,
+}
+
+
+class ExplainTest(unittest.TestCase):
+
+    def setUp(self):
+        client = boto3.session.Session().client('rds-data', region_name="eu-central-1")
+        self.stubber = Stubber(client)
+        self.stubber.activate()
+        aurora.set_client_factory(lambda region_name, config, tcp_keepalive: client)
+
+    def tearDown(self):
+        self.stubber.deactivate()
+        aurora.set_client_factory(None)
+
+    def expect_explain(self, transaction_id=None):
+        expected = {'resourceArn': aurora.DBAuroraClusterArn, 'secretArn': aurora.DBSecretsStoreArn,
+                    'database': aurora.DBName, 'sql': "explain " + SQL, 'parameters': PARAMETERS,
+                    'includeResultMetadata': True}
+        if transaction_id is not None:
+            expected['transactionId'] = transaction_id
+        self.stubber.add_response('execute_statement', EXPLAIN_RESPONSE, expected)
+
+    def test_explain_outside_of_a_transaction(self):
+        self.expect_explain()
+        self.assertEqual(slow_log.explain(SQL, PARAMETERS), [{'table': "shows", 'type': "const"}])
+        self.stubber.assert_no_pending_responses()
+
+    def test_explain_in_a_transaction(self):
+        self.expect_explain("tx-1")
+        self.assertEqual(slow_log.explain(SQL, PARAMETERS, "tx-1"), [{'table': "shows", 'type': "const"}])
+        self.stubber.assert_no_pending_responses()
+
+    def test_explain_is_sent_once(self):
+        self.stubber.add_client_error('execute_statement', 'DatabaseResumingException',
+                                      "Database is resuming after being auto-paused")
+        self.assertTrue(slow_log.explain(SQL, PARAMETERS).startswith("explain failed:"))
+        self.stubber.assert_no_pending_responses()
+
+    def test_statements_mysql_cannot_explain(self):
+        self.assertIsNone(slow_log.explain("show tables", []))
+
+
+if __name__ == "__main__":
+    unittest.main()